@@ -1,8 +1,10 @@
 import altair as alt
 import pandas as pd
-import scipy.stats as stats
 import streamlit as st
 
+from bpviz import data as bpdata
+from bpviz.percentiles import percentiles, status
+
 # Streamlit app setup
 st.title('Pediatric Blood Pressure Percentiles')
 
@@ -18,11 +20,13 @@ systolic_percentile = systolic_bp + age - height  # Example value
 diastolic_percentile = diastolic_bp + age - height # Example value
 
 # Load NHANES
-nhanes = pd.read_csv('nhanes/nhanes_clean.csv')
-nhanes_pedi = nhanes[nhanes['RIDAGEYR'] <= 13]
-nhanes_pedi['SEQN'] = [int(x) for x in nhanes_pedi['SEQN']]
-patient_id = st.selectbox('Select a patient (NHANES ID):', sorted(set(nhanes_pedi['SEQN'])))
-nhanes_pt = nhanes_pedi[nhanes_pedi['SEQN'] == patient_id]
+nhanes_pedi = bpdata.pediatric()
+query = st.text_input('Search patients by NHANES ID:')
+patient_id = st.selectbox('Select a patient (NHANES ID):', nhanes_pedi.index.search(query).items)
+if patient_id is None:
+    st.info('No patients match that NHANES ID.')
+    st.stop()
+nhanes_pt = nhanes_pedi.frame.iloc[[nhanes_pedi.index.offset(patient_id)]]
 
 # Data for the chart
 data = pd.DataFrame({
@@ -30,53 +34,13 @@ data = pd.DataFrame({
     'Sex': ['M' if int(item) == 1 else 'F' for item in nhanes_pt['RIAGENDR'] for _ in range(2)],
     'Weight': [item for item in nhanes_pt['BMXWT'] for _ in range(2)],
     'Height': [item for item in nhanes_pt['BMXHT'] for _ in range(2)],
-    'Blood Pressure Value': nhanes_pt[['BPXSY1', 'BPXDI1']].values.flatten().tolist(),
+    'Blood Pressure Value': nhanes_pt[['SBP_AVG', 'DBP_AVG']].values.flatten().tolist(),
     'Type': [item for pair in [('Systolic BP', 'Diastolic BP') for _ in range(len(nhanes_pt))] for item in pair]
 })
 
 # Calculate the percentile from the BP tables
-def calc_percentile(value, percentile_50, percentile_95):
-    sigma = (percentile_95 - percentile_50) / 1.645
-    return stats.norm.cdf((value - percentile_50) / sigma) * 100
-
-pertable_fd = pd.read_csv('bp-tables/FemaleDBP.csv')
-pertable_fs = pd.read_csv('bp-tables/FemaleSBP.csv')
-pertable_md = pd.read_csv('bp-tables/MaleDBP.csv')
-pertable_ms = pd.read_csv('bp-tables/MaleSBP.csv')
-for index, row in data.iterrows():
-    # Pick the right table
-    if row['Sex'] == 'M':
-        if row['Type'] == 'Systolic BP':
-            pertable = pertable_ms
-        elif row['Type'] == 'Diastolic BP':
-            pertable = pertable_md
-    elif row['Sex'] == 'F':
-        if row['Type'] == 'Systolic BP':
-            pertable = pertable_fs
-        elif row['Type'] == 'Diastolic BP':
-            pertable = pertable_fd
-    current_pertable = pertable[pertable['Age (y)'] == round(row['Age'])]
-    
-    # Get the appropriate column by finding the closest matching height
-    hts = current_pertable[current_pertable['Data'] == 'Height (cm)']
-    hts = hts.iloc[:,2:]
-    ht_col = abs(hts - row['Height']).stack().idxmin()[1]
-
-    # Calculate the percentile
-    bp_50 = current_pertable[current_pertable['Data'] == '50th'][ht_col].item()
-    bp_95 = current_pertable[current_pertable['Data'] == '95th'][ht_col].item()
-    bp_perc = calc_percentile(row['Blood Pressure Value'], bp_50, bp_95)
-    data.at[index, 'Percentile'] = bp_perc
-
-    # Label the percentile
-    bp_label = ''
-    if bp_perc <= 90:
-        bp_label = 'Normal BP'
-    elif bp_perc <= 95:
-        bp_label = 'Elevated BP'
-    else:
-        bp_label = 'Hypertension'
-    data.at[index, 'Blood Pressure Status'] = bp_label
+data['Percentile'] = percentiles(data['Sex'], data['Type'], data['Age'], data['Height'], data['Blood Pressure Value'])
+data['Blood Pressure Status'] = status(data['Percentile'])
 
 
 # Tooltip
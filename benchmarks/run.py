@@ -0,0 +1,208 @@
+"""Benchmarks for the percentile, lookup and ingest hot paths.
+
+    python benchmarks/run.py                       # run and print
+    python benchmarks/run.py --save                # also write benchmarks/baseline.json
+    python benchmarks/run.py --compare             # fail if slower than the baseline
+
+Each case is timed over several repeats on seeded synthetic input (1 to
+10^6 rows) and reports median latency, throughput and peak traced memory.
+The legacy paths (the MR_viz.py iterrows loop and scalar calc_percentile)
+are only run up to LEGACY_MAX_ROWS rows since they take ~5 ms per row.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bpviz import data, ingest, tables, xpt  # noqa: E402
+from bpviz.percentiles import percentiles, score  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+LEGACY_MAX_ROWS = 100
+XPT_FILE = os.path.join(ROOT, 'nhanes', 'DEMO_J.XPT')
+XPT_COLUMNS = ['SEQN', 'RIAGENDR', 'RIDAGEYR', 'RIDAGEMN']
+NHANES_CSV = os.path.join(ROOT, 'nhanes', 'nhanes_clean.csv')
+
+# Slower than baseline by more than this factor counts as a regression
+TOLERANCE = 1.5
+
+
+def synthetic(rows, seed=0):
+    """Children aged 1-13 with plausible heights and readings, in the viz page's data layout."""
+    rng = np.random.default_rng(seed)
+    age = rng.uniform(1, 13, rows)
+    return pd.DataFrame({
+        'Age': age,
+        'Sex': rng.choice(['M', 'F'], rows),
+        'Height': 75 + 6 * age + rng.normal(0, 8, rows),
+        'Blood Pressure Value': rng.normal(95, 15, rows).round(),
+        'Type': rng.choice(['Systolic BP', 'Diastolic BP'], rows),
+    })
+
+
+# The scoring code MR_viz.py used before the vectorized engine
+def legacy_calc_percentile(value, percentile_50, percentile_95):
+    import scipy.stats as stats
+
+    sigma = (percentile_95 - percentile_50) / 1.645
+    return stats.norm.cdf((value - percentile_50) / sigma) * 100
+
+
+def legacy_score(data_frame, pertables):
+    for index, row in data_frame.iterrows():
+        pertable = pertables[(row['Sex'], row['Type'])]
+        current_pertable = pertable[pertable['Age (y)'] == round(row['Age'])]
+        hts = current_pertable[current_pertable['Data'] == 'Height (cm)']
+        hts = hts.iloc[:, 2:]
+        ht_col = abs(hts - row['Height']).stack().idxmin()[1]
+        bp_50 = current_pertable[current_pertable['Data'] == '50th'][ht_col].item()
+        bp_95 = current_pertable[current_pertable['Data'] == '95th'][ht_col].item()
+        data_frame.at[index, 'Percentile'] = legacy_calc_percentile(row['Blood Pressure Value'], bp_50, bp_95)
+
+
+def legacy_tables():
+    read = lambda name: pd.read_csv(os.path.join(tables.TABLE_DIR, name))  # noqa: E731
+    return {
+        ('M', 'Systolic BP'): read('MaleSBP.csv'),
+        ('M', 'Diastolic BP'): read('MaleDBP.csv'),
+        ('F', 'Systolic BP'): read('FemaleSBP.csv'),
+        ('F', 'Diastolic BP'): read('FemaleDBP.csv'),
+    }
+
+
+def legacy_load_data_xpt(filename, columns_to_keep=None):
+    import xport
+
+    with open(filename, 'rb') as f:
+        df = pd.DataFrame(xport.to_dataframe(f))
+        if columns_to_keep is not None:
+            df = df[[col for col in columns_to_keep if col in df.columns]]
+        return df
+
+
+def measure(func, repeats):
+    """Median seconds over repeats and peak traced bytes of one extra run."""
+    func()  # warm up imports and caches
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def cases(max_rows):
+    """Yield (name, rows, callable) for every benchmark case."""
+    pertables = legacy_tables()
+    tables.load()
+    for rows in [size for size in SIZES if size <= max_rows]:
+        frame = synthetic(rows)
+        if rows <= LEGACY_MAX_ROWS:
+            yield 'score/legacy_iterrows', rows, lambda frame=frame: legacy_score(frame.copy(), pertables)
+            values = frame['Blood Pressure Value'].tolist()
+            yield 'percentile/legacy_scalar_norm_cdf', rows, lambda values=values: [legacy_calc_percentile(v, 90, 105) for v in values]
+        yield 'score/vectorized', rows, lambda frame=frame: percentiles(
+            frame['Sex'], frame['Type'], frame['Age'], frame['Height'], frame['Blood Pressure Value'])
+        yield 'score/vectorized_linear', rows, lambda frame=frame: percentiles(
+            frame['Sex'], frame['Type'], frame['Age'], frame['Height'], frame['Blood Pressure Value'], mode='linear')
+        # SBP and DBP per row, whole-mmHg readings served from the precomputed grid
+        yield 'score/grid', 2 * rows, lambda frame=frame: score(
+            frame['Sex'], frame['Age'], frame['Height'], frame['Blood Pressure Value'], frame['Blood Pressure Value'])
+        sex = np.where(frame['Sex'] == 'M', 0, 1)
+        measure_idx = np.where(frame['Type'] == 'Systolic BP', 0, 1)
+        age_idx = np.rint(frame['Age'].to_numpy()).astype(int) - tables.MIN_AGE
+        height = frame['Height'].to_numpy()
+        yield 'lookup/height_column', rows, lambda sex=sex, measure_idx=measure_idx, age_idx=age_idx, height=height: tables.height_column(
+            tables.load(), sex, measure_idx, age_idx, height)
+
+    rows = len(xpt.read(XPT_FILE, ['SEQN']))
+    try:
+        import xport  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        yield 'ingest/legacy_load_data_xpt', rows, lambda: legacy_load_data_xpt(XPT_FILE, XPT_COLUMNS)
+    yield 'ingest/pandas_read_sas', rows, lambda: pd.read_sas(XPT_FILE, format='xport')[XPT_COLUMNS]
+    yield 'ingest/xpt_stream', rows, lambda: ingest.read_xpt(XPT_FILE, XPT_COLUMNS)
+
+    rows = len(pd.read_csv(NHANES_CSV, usecols=['SEQN']))
+    yield 'load/read_csv', rows, lambda: pd.read_csv(NHANES_CSV)
+    # Drop the process cache first, so this times the data layer's cold load and not a dict hit
+    yield 'load/data_layer_cold', rows, lambda: (data.clear(), data.nhanes(NHANES_CSV))
+
+
+def run(max_rows, repeats):
+    results = {}
+    for name, rows, func in cases(max_rows):
+        seconds, peak = measure(func, repeats if rows < 100000 else 1)
+        key = '%s[%d]' % (name, rows)
+        results[key] = {
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds else float('inf'),
+            'peak_bytes': peak,
+        }
+        print('%-48s %12.6f s %14.0f rows/s %10.1f MiB' % (key, seconds, results[key]['rows_per_second'], peak / 2 ** 20))
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return the cases that got slower than tolerance x baseline."""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get('results', {}).get(key)
+        if before and result['seconds'] > tolerance * before['seconds']:
+            regressions.append((key, before['seconds'], result['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--max-rows', type=int, default=SIZES[-1], help='largest synthetic input size')
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs per case')
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='exit 1 if any case regressed against the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON path')
+    args = parser.parse_args(argv)
+
+    results = run(args.max_rows, args.repeats)
+    if args.compare:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for key, before, after in regressions:
+            print('REGRESSION %s: %.6f s -> %.6f s' % (key, before, after))
+        if regressions:
+            return 1
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=1, sort_keys=True)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
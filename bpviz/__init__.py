@@ -0,0 +1,4 @@
+"""Pediatric blood pressure percentile tools shared by the Streamlit pages and batch scripts.
+
+The scoring functions live in bpviz.percentiles (percentiles, score, status).
+"""
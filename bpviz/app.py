@@ -0,0 +1,132 @@
+"""The pediatric BP percentile Streamlit page (run through MR_viz.py).
+
+Streamlit re-executes MR_viz.py on every interaction but imports this
+module once per server process, so everything at module level here is paid
+for once. The scoring core only needs NumPy, and the charts are cached
+Vega-Lite templates from bpviz.charts that only get new data per rerun.
+"""
+
+import pandas as pd
+import streamlit as st
+
+from bpviz import bands, charts, metrics
+from bpviz.data import patient, pediatric, visit_store
+from bpviz.percentiles import percentiles, status
+
+NO_PATIENT = 'Select a patient OR input values below'
+
+ACTIONS_MARKDOWN = """
+### Recommended Actions Based on Blood Pressure Status
+
+| Blood Pressure Status | Actions |
+|-----------------------|---------|
+| **Normal BP (<90th percentile)** | - No additional action is needed<br>- BP should be rechecked at the next routine well-child care visit |
+| **Elevated BP (≥90th to <95th percentile)** | - Lifestyle interventions (nutrition, sleep, physical activity) should be initiated<br>- BP should be rechecked by auscultatory measurement in 6 months<br>- If BP remains elevated at 6 months, check upper and lower extremity BP and repeat lifestyle measures<br>- If BP is still elevated after 12 months from initial measurement, order ambulatory blood pressure monitoring along with diagnostic evaluation, and consider subspecialty referral |
+| **Hypertension (≥95th percentile)** |- If symptomatic, refer to emergency department immediately for evaluation and treatment <br>- If asymptomatic, initiate lifestyle interventions<br>- BP should be rechecked by auscultatory measurement in 1-2 weeks<br>- If it remains classified as hypertension at 1-2 weeks, check upper and lower extremity BP, and recheck BP in 3 months by auscultation with consideration for nutrition/weight management referral<br>- If BP continues to be classified as hypertension after 3 visits, order ambulatory blood pressure monitoring along with diagnostic evaluation, and initiate treatment with consideration for subspecialty referral |
+"""
+
+def patient_picker():
+    """Search the patient index and only send the current page of matches to the browser.
+
+    Returns the selected patient and the page of matching SEQNs.
+    """
+    patient_index = pediatric().index
+    query = st.text_input('Search patients by NHANES ID (prefix, or a range like 6500-6600):')
+    results = patient_index.search(query)
+    if results.pages > 1:
+        results = patient_index.search(query, page=st.number_input(f'Results page (of {results.pages}):', min_value=1, max_value=results.pages, value=1))
+    st.caption(f'{results.total} matching patients')
+    return st.selectbox('Select a patient (NHANES ID):', [NO_PATIENT] + results.items), results.items
+
+
+def readings(patient_id):
+    """The two readings to plot, from the inputs or the selected NHANES patient."""
+    if patient_id == NO_PATIENT:
+        # User inputs
+        sex = st.radio('Select sex:', ('Male', 'Female'))
+        age = st.slider('Select age (years):', min_value=0, max_value=13, value=10)
+        height = st.number_input('Enter height (cm):', min_value=0, value=135)
+        systolic_bp = st.number_input('Enter systolic blood pressure (mmHg):', min_value=0, value=100)
+        diastolic_bp = st.number_input('Enter diastolic blood pressure (mmHg):', min_value=0, value=70)
+
+        # Create a DataFrame for user inputs
+        return pd.DataFrame({
+            'Age': [age for _ in range(2)],
+            'Sex': [sex[0] for _ in range(2)],  # Use 'M' or 'F'
+            'Height': [height for _ in range(2)],
+            'Blood Pressure Value': [systolic_bp, diastolic_bp],
+            'Type': ['Systolic BP', 'Diastolic BP']
+        })
+
+    # Process NHANES data for selected patient
+    nhanes_pt = patient(patient_id)
+    return pd.DataFrame({
+        'Age': [nhanes_pt['RIDAGEYR'] for _ in range(2)],
+        'Sex': ['M' if nhanes_pt['RIAGENDR'] == 1 else 'F' for _ in range(2)],
+        'Height': [nhanes_pt['BMXHT'] for _ in range(2)],
+        'Blood Pressure Value': [nhanes_pt['SBP_AVG'], nhanes_pt['DBP_AVG']],  # Average of the visit's readings
+        'Type': ['Systolic BP', 'Diastolic BP']
+    })
+
+
+def main():
+    with metrics.profiled('app'), metrics.timer('rerun'):
+        _page()
+
+
+def _show(spec, frame, columns):
+    with metrics.timer('chart_render'):
+        charts.render(spec, frame, columns)
+
+
+def _results_chart(seqns):
+    """All patients on the current results page as points in one chart."""
+    pedi = pediatric()
+    with metrics.timer('chart_build'):
+        points = charts.points_frame(pedi.frame.iloc[[pedi.index.offset(seqn) for seqn in seqns]])
+    _show(charts.patients_spec(), points, charts.PATIENT_COLUMNS)
+
+
+def _page():
+    # Streamlit app setup
+    st.title('Pediatric Blood Pressure Percentiles for Screening and Management of High Blood Pressure (0-13 years old)')
+
+    patient_id, matches = patient_picker()
+    data = readings(patient_id)
+
+    # Calculate percentiles for either user input or NHANES data
+    data['Percentile'] = percentiles(data['Sex'], data['Type'], data['Age'], data['Height'], data['Blood Pressure Value'])
+    data['Blood Pressure Status'] = status(data['Percentile'])
+
+    # Display the chart in Streamlit
+    _show(charts.percentile_spec(), data, charts.POINT_COLUMNS)
+
+    # The readings in mmHg against the reference curves for the child's sex and height
+    first = data.iloc[0]
+    height_percentile = bands.height_percentile(first['Sex'], first['Age'], first['Height'])
+    if height_percentile is not None:
+        st.markdown('### Blood Pressure by Age (mmHg)')
+        st.caption(f'50th, 90th and 95th percentile curves at the {height_percentile}th height percentile')
+        with metrics.timer('chart_build'):
+            reference = charts.bands_with_points(data, height_percentile)
+        _show(charts.bands_spec(), reference, charts.BAND_COLUMNS)
+
+    if matches and st.checkbox(f'Plot all {len(matches)} patients on this results page'):
+        _results_chart(matches)
+
+    # Percentile trajectory across visits, when the visit store has a history for this patient
+    store = visit_store() if patient_id != NO_PATIENT else None
+    history = store.history(patient_id) if store is not None else None
+    if history is not None and len(history) > 1:
+        st.markdown('### Blood Pressure Percentile Across Visits')
+        with metrics.timer('chart_build'):
+            trajectory = charts.trajectory_frame(history)
+        _show(charts.trajectory_spec(), trajectory, charts.TRAJECTORY_COLUMNS)
+
+        # Visits that trigger a follow-up rule from the table below
+        flagged = history[history['Flag'] != '']
+        if len(flagged):
+            st.warning('\n'.join(f"- Age {row['Age']:.1f}: {row['Flag']}" for _, row in flagged.iterrows()))
+
+    # Adding the table below the chart
+    st.markdown(ACTIONS_MARKDOWN, unsafe_allow_html=True)
@@ -0,0 +1,91 @@
+"""Reference BP curves (mmHg) across age for a sex and height percentile.
+
+For one height column of the tables, the 50th and 95th percentile BP are
+taken at each tabulated age and interpolated linearly in age (as in
+mode='linear'). The BP at percentile p is then
+
+    p50 + ppf(p) * sigma,    sigma = (p95 - p50) / Z95
+
+the inverse of the scoring engine's calculation, so scoring a curve's value
+gives back its percentile. Results are cached per (sex, measure, height
+column, resolution) and returned read-only.
+"""
+
+import functools
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+from bpviz import tables
+from bpviz.percentiles import Z95, measure_index, sex_index
+from bpviz.tables import HEIGHT_PERCENTILES, TABLE_DIR
+
+BAND_PERCENTILES = (50, 90, 95)
+RESOLUTION = 0.1  # years between curve points
+AGES = (1, 13)  # the pediatric range the charts show; the tables go up to 17
+
+Bands = namedtuple('Bands', ['age', 'percentiles', 'bp'])
+
+_inv_cdf = np.frompyfunc(NormalDist().inv_cdf, 1, 1)
+
+
+def ppf(p):
+    """Inverse standard normal CDF of probabilities p (0 < p < 1)."""
+    return np.asarray(_inv_cdf(np.asarray(p, dtype=float)), dtype=float)
+
+
+def _index(value, convert, name):
+    index = int(convert(value))
+    if index < 0:
+        raise ValueError('unknown %s %r' % (name, value))
+    return index
+
+
+def height_column(height_percentile):
+    """Table column of a height percentile (5, 10, 25, 50, 75, 90 or 95)."""
+    try:
+        return HEIGHT_PERCENTILES.index(height_percentile)
+    except ValueError:
+        raise ValueError('height percentile must be one of %s' % ', '.join(map(str, HEIGHT_PERCENTILES))) from None
+
+
+@functools.lru_cache(maxsize=None)
+def _bands(sex, measure, column, resolution, percentiles, ages, table_dir):
+    tensor = tables.load(table_dir)
+    table_ages = tables.ages(tensor)
+    first, last = max(ages[0], table_ages[0]), min(ages[1], table_ages[-1])
+    steps = int(np.floor((last - first) / resolution + 1e-9))
+    age = np.round(first + np.arange(steps + 1) * resolution, 9)
+    bp50 = np.interp(age, table_ages, tensor[sex, measure, :, column, tables.P50])
+    bp95 = np.interp(age, table_ages, tensor[sex, measure, :, column, tables.P95])
+    z = ppf(np.array(percentiles) / 100)
+    bp = bp50 + z[:, None] * ((bp95 - bp50) / Z95)
+    for array in (age, bp):
+        array.flags.writeable = False
+    return Bands(age, percentiles, bp)
+
+
+def bands(sex, measure, height_percentile=50, resolution=RESOLUTION, percentiles=BAND_PERCENTILES, ages=AGES,
+          table_dir=TABLE_DIR):
+    """BP curves for one sex ('M'/'F' or 1/2), measure and height percentile.
+
+    Returns Bands(age, percentiles, bp) where bp[i] is the curve of
+    percentiles[i] at each age in ages (years, clipped to the tables),
+    resolution years apart.
+    """
+    if resolution <= 0:
+        raise ValueError('resolution must be positive')
+    return _bands(_index(sex, sex_index, 'sex'), _index(measure, measure_index, 'measure'),
+                  height_column(height_percentile), float(resolution), tuple(percentiles),
+                  (float(ages[0]), float(ages[1])), table_dir)
+
+
+def height_percentile(sex, age, height, table_dir=TABLE_DIR):
+    """Height percentile column closest to a child's height at the (rounded) age; None if out of range."""
+    tensor = tables.load(table_dir)
+    s = int(sex_index(sex))
+    a = int(np.rint(age)) - tables.MIN_AGE
+    if s < 0 or not 0 <= a < tensor.shape[2] or np.isnan(height):
+        return None
+    return HEIGHT_PERCENTILES[int(tables.height_column(tensor, s, 0, a, float(height)))]
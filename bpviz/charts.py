@@ -0,0 +1,215 @@
+"""Vega-Lite chart templates for the percentile charts.
+
+The specs are plain dicts built once per process (they hold no data). A
+render hands Streamlit the cached spec plus a frame of just the plotted
+columns through st.vega_lite_chart, so nothing is rebuilt or validated per
+rerun and only the data values change between interactions. The 50th/90th/
+95th rules are inline constants in the spec; the point colors are computed
+in the browser from the percentile.
+
+Any number of patients can go in one chart: points_frame() stacks their
+rows into a single datasource and patients_spec() keys the tooltip on SEQN.
+bands_spec() draws readings in mmHg over the 50th/90th/95th reference
+curves from bpviz.bands, which are cached per sex and height percentile.
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+from bpviz import bands
+from bpviz.percentiles import percentiles, status
+from bpviz.tables import MEASURES
+
+SCHEMA = 'https://vega.github.io/schema/vega-lite/v5.json'
+HEIGHT = 350
+
+POINT_COLUMNS = ['Age', 'Type', 'Blood Pressure Value', 'Percentile', 'Blood Pressure Status']
+PATIENT_COLUMNS = ['SEQN'] + POINT_COLUMNS
+TRAJECTORY_COLUMNS = POINT_COLUMNS + ['Flag']
+BAND_COLUMNS = POINT_COLUMNS + ['Layer']
+
+# Red at or above the 95th percentile, gold at or above the 90th, otherwise green
+COLOR_EXPR = "datum.Percentile >= 95 ? 'red' : (datum.Percentile >= 90 ? 'darkgoldenrod' : 'darkgreen')"
+
+PERCENTILE_LINES = [
+    {'Percentile': 50, 'Label': '50th'},
+    {'Percentile': 90, 'Label': '90th'},
+    {'Percentile': 95, 'Label': '95th'},
+]
+
+AGE_AXIS = {'field': 'Age', 'type': 'quantitative', 'title': 'Age (years)',
+            'axis': {'values': list(range(14))}, 'scale': {'domain': [0, 13]}}
+PERCENTILE_AXIS = {'field': 'Percentile', 'type': 'quantitative', 'title': 'Blood Pressure Percentile',
+                   'scale': {'domain': [0, 100]}}
+BP_AXIS = {'field': 'Blood Pressure Value', 'type': 'quantitative', 'title': 'Blood Pressure (mmHg)',
+           'scale': {'zero': False}}
+
+CONFIG = {'view': {'strokeWidth': 0}, 'axis': {'labelPadding': 5, 'titlePadding': 5, 'grid': False}}
+
+TOOLTIP = [
+    {'field': 'Type', 'type': 'nominal', 'title': 'Type'},
+    {'field': 'Blood Pressure Value', 'type': 'quantitative', 'title': 'Value'},
+    {'field': 'Percentile', 'type': 'quantitative', 'title': 'Percentile', 'format': '.0f'},
+    {'field': 'Blood Pressure Status', 'type': 'nominal', 'title': 'Status'},
+]
+
+
+def _layered(layer):
+    """Wrap a data layer with the percentile rules, their labels and the page styling."""
+    lines = {
+        'data': {'values': PERCENTILE_LINES},
+        'mark': {'type': 'rule', 'color': 'black', 'size': 1.5},
+        'encoding': {'y': {'field': 'Percentile', 'type': 'quantitative'}},
+    }
+    labels = {
+        'data': {'values': PERCENTILE_LINES},
+        'mark': {'type': 'text', 'align': 'right', 'dx': -2, 'dy': -5},
+        'encoding': {
+            'x': {'value': 344.5},
+            'y': {'field': 'Percentile', 'type': 'quantitative'},
+            'text': {'field': 'Label', 'type': 'nominal'},
+        },
+    }
+    return {
+        '$schema': SCHEMA,
+        'width': 'container',
+        'height': HEIGHT,
+        'layer': [layer, lines, labels],
+        'config': CONFIG,
+    }
+
+
+def _points(tooltip, size=100, opacity=1):
+    return {
+        'transform': [{'calculate': COLOR_EXPR, 'as': 'Color'}],
+        'mark': {'type': 'point', 'filled': True, 'size': size, 'opacity': opacity},
+        'encoding': {
+            'x': AGE_AXIS,
+            'y': PERCENTILE_AXIS,
+            'color': {'field': 'Color', 'type': 'nominal', 'scale': None, 'legend': {'title': 'Percentile Color'}},
+            'tooltip': tooltip,
+        },
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def percentile_spec():
+    """One patient's (or the entered) SBP and DBP points."""
+    return _layered(_points(TOOLTIP))
+
+
+@functools.lru_cache(maxsize=None)
+def patients_spec():
+    """Points for many patients from one datasource, with the SEQN in the tooltip."""
+    tooltip = [{'field': 'SEQN', 'type': 'nominal', 'title': 'NHANES ID'}] + TOOLTIP
+    spec = _points(tooltip, size=60, opacity=0.7)
+    spec['encoding']['shape'] = {'field': 'Type', 'type': 'nominal', 'legend': {'title': 'Type'}}
+    return _layered(spec)
+
+
+@functools.lru_cache(maxsize=None)
+def trajectory_spec():
+    """One line per measure through a patient's visits."""
+    tooltip = TOOLTIP + [{'field': 'Age', 'type': 'quantitative', 'title': 'Age', 'format': '.1f'},
+                         {'field': 'Flag', 'type': 'nominal', 'title': 'Follow-up'}]
+    return _layered({
+        'mark': {'type': 'line', 'point': True},
+        'encoding': {
+            'x': AGE_AXIS,
+            'y': PERCENTILE_AXIS,
+            'color': {'field': 'Type', 'type': 'nominal', 'legend': {'title': 'Type'}},
+            'tooltip': tooltip,
+        },
+    })
+
+
+@functools.lru_cache(maxsize=None)
+def bands_spec():
+    """Readings in mmHg over the SBP and DBP reference curves, from one datasource."""
+    curves = {
+        'transform': [{'filter': "datum.Layer == 'band'"}],
+        'mark': {'type': 'line', 'strokeWidth': 1.5},
+        'encoding': {
+            'x': AGE_AXIS,
+            'y': BP_AXIS,
+            'color': {'field': 'Type', 'type': 'nominal', 'legend': {'title': 'Type'}},
+            'strokeDash': {'field': 'Percentile', 'type': 'ordinal', 'legend': {'title': 'Reference percentile'}},
+            'tooltip': [
+                {'field': 'Type', 'type': 'nominal', 'title': 'Type'},
+                {'field': 'Percentile', 'type': 'ordinal', 'title': 'Percentile'},
+                {'field': 'Age', 'type': 'quantitative', 'title': 'Age', 'format': '.1f'},
+                {'field': 'Blood Pressure Value', 'type': 'quantitative', 'title': 'mmHg', 'format': '.0f'},
+            ],
+        },
+    }
+    points = _points(TOOLTIP)
+    points['transform'].insert(0, {'filter': "datum.Layer == 'point'"})
+    points['encoding']['y'] = BP_AXIS
+    return {
+        '$schema': SCHEMA,
+        'width': 'container',
+        'height': HEIGHT,
+        'layer': [curves, points],
+        'resolve': {'scale': {'color': 'independent'}},
+        'config': CONFIG,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def bands_frame(sex, height_percentile):
+    """Long-format SBP and DBP reference curves (shared between reruns; do not modify)."""
+    frames = []
+    for measure in MEASURES:
+        curves = bands.bands(sex, measure, height_percentile)
+        frames.append(pd.DataFrame({
+            'Age': np.tile(curves.age, len(curves.percentiles)),
+            'Type': measure,
+            'Blood Pressure Value': curves.bp.ravel(),
+            'Percentile': np.repeat(curves.percentiles, len(curves.age)),
+            'Blood Pressure Status': '',
+            'Layer': 'band',
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def bands_with_points(data, height_percentile):
+    """The cached curves for the readings' sex plus the readings themselves, as one frame."""
+    return pd.concat([bands_frame(data['Sex'].iloc[0], height_percentile),
+                      data.assign(Layer='point')[BAND_COLUMNS]], ignore_index=True)
+
+
+def points_frame(rows, sbp='SBP_AVG', dbp='DBP_AVG'):
+    """Scored long-format points (two per patient) for NHANES rows, in one vectorized pass."""
+    n = len(rows)
+    sex = np.where(rows['RIAGENDR'].to_numpy() == 1, 'M', 'F')
+    points = pd.DataFrame({
+        'SEQN': np.repeat(rows['SEQN'].to_numpy(), 2),
+        'Age': np.repeat(rows['RIDAGEYR'].to_numpy(), 2),
+        'Sex': np.repeat(sex, 2),
+        'Height': np.repeat(rows['BMXHT'].to_numpy(), 2),
+        'Blood Pressure Value': np.column_stack([rows[sbp].to_numpy(), rows[dbp].to_numpy()]).ravel(),
+        'Type': np.tile(['Systolic BP', 'Diastolic BP'], n),
+    })
+    points['Percentile'] = percentiles(points['Sex'], points['Type'], points['Age'], points['Height'], points['Blood Pressure Value'])
+    points['Blood Pressure Status'] = status(points['Percentile'])
+    return points
+
+
+def trajectory_frame(history):
+    """Long-format SBP/DBP rows for a visit history from the visit store."""
+    return pd.concat([
+        history.assign(**{'Type': 'Systolic BP', 'Blood Pressure Value': history['SBP'],
+                          'Percentile': history['SBP Percentile'], 'Blood Pressure Status': history['SBP Status']}),
+        history.assign(**{'Type': 'Diastolic BP', 'Blood Pressure Value': history['DBP'],
+                          'Percentile': history['DBP Percentile'], 'Blood Pressure Status': history['DBP Status']}),
+    ])[TRAJECTORY_COLUMNS]
+
+
+def render(spec, frame, columns):
+    """Send the cached spec and only the plotted columns of frame to the browser."""
+    import streamlit as st
+
+    # Streamlit may add keys (autosize) to the spec it is given; keep the cached one untouched
+    st.vega_lite_chart(frame[columns], dict(spec), use_container_width=True)
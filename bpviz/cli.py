@@ -0,0 +1,217 @@
+"""Command-line batch scoring and the HTTP service launcher.
+
+    python -m bpviz score nhanes/nhanes_clean.csv scored.csv
+    python -m bpviz score vitals.parquet scored.parquet --map RIAGENDR=sex --map BMXHT=height_cm --workers 4
+    python -m bpviz add-visits clinic_visits.csv
+    python -m bpviz compact nhanes/nhanes_clean.csv nhanes/nhanes_clean.arrow
+    python -m bpviz serve --port 8000
+
+Input is read in chunks and every scored chunk is written out before more
+input is read, so memory stays bounded by chunk size times the number of
+chunks in flight.
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from bpviz import metrics, storage
+from bpviz.percentiles import MODES, score
+from bpviz.readings import average_readings
+from bpviz.visits import VISITS_DIR, VisitStore
+
+# Columns scoring needs, in the nhanes_clean.csv schema
+INPUT_COLUMNS = ['SEQN', 'RIAGENDR', 'RIDAGEYR', 'BMXHT', 'BPXSY1', 'BPXDI1']
+CHUNKSIZE = 100000
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def _is_arrow(path):
+    return os.path.splitext(path)[1].lower() in ('.arrow', '.feather')
+
+
+def read_chunks(path, chunksize=CHUNKSIZE):
+    """Yield DataFrames of at most chunksize rows from a CSV, Parquet or Arrow file."""
+    if _is_arrow(path):
+        # Memory-mapped: each chunk is a zero-copy slice until it is converted
+        table = storage.read_table(path)
+        for start in range(0, table.num_rows, chunksize):
+            yield table.slice(start, chunksize).to_pandas()
+    elif _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Append DataFrames to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_chunk(chunk, mapping=None, mode='nearest', average=False):
+    """Add SBP/DBP percentile and status columns to a chunk; mapping renames standard -> input columns.
+
+    With average=True the readings scored are the SBP_AVG/DBP_AVG means of
+    whichever BPXSY1-3/BPXDI1-3 (or oscillometric BPXOSY/BPXODI) columns
+    the chunk has, and those averages are written out too.
+    """
+    mapping = mapping or {}
+    col = {name: mapping.get(name, name) for name in INPUT_COLUMNS}
+    if average:
+        chunk = chunk.assign(**average_readings(chunk.rename(columns={v: k for k, v in mapping.items()})))
+        sbp, dbp = chunk['SBP_AVG'], chunk['DBP_AVG']
+    else:
+        sbp, dbp = chunk[col['BPXSY1']], chunk[col['BPXDI1']]
+    scores = score(chunk[col['RIAGENDR']], chunk[col['RIDAGEYR']], chunk[col['BMXHT']], sbp, dbp, mode=mode)
+    return chunk.assign(**scores)
+
+
+def score_file(input_path, output_path, mapping=None, chunksize=CHUNKSIZE, workers=1, mode='nearest', average=False):
+    """Score every row of input_path into output_path; returns the number of rows written."""
+    rows = 0
+    with ChunkWriter(output_path) as writer:
+        if workers <= 1:
+            for chunk in read_chunks(input_path, chunksize):
+                writer.write(score_chunk(chunk, mapping, mode, average))
+                rows += len(chunk)
+            return rows
+
+        # Keep a bounded window of chunks in flight and write results in input order
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in read_chunks(input_path, chunksize):
+                pending.append(pool.submit(score_chunk, chunk, mapping, mode, average))
+                if len(pending) >= 2 * workers:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows += len(scored)
+            while pending:
+                scored = pending.popleft().result()
+                writer.write(scored)
+                rows += len(scored)
+    return rows
+
+
+def add_visits(input_path, store_dir=VISITS_DIR, mapping=None, chunksize=CHUNKSIZE):
+    """Append every row of input_path to the visit store; returns the number of visits added."""
+    mapping = mapping or {}
+    col = {name: mapping.get(name, name) for name in INPUT_COLUMNS}
+    store = VisitStore(store_dir)
+    rows = 0
+    for chunk in read_chunks(input_path, chunksize):
+        store.append(chunk[col['SEQN']], chunk[col['RIAGENDR']], chunk[col['RIDAGEYR']],
+                     chunk[col['BMXHT']], chunk[col['BPXSY1']], chunk[col['BPXDI1']])
+        rows += len(chunk)
+    return rows
+
+
+def serve(host, port, workers=1):
+    try:
+        import uvicorn
+    except ImportError:
+        print('python -m bpviz serve needs uvicorn (pip install uvicorn)', file=sys.stderr)
+        return 1
+    uvicorn.run('bpviz.service:app', host=host, port=port, workers=workers)
+    return 0
+
+
+def _parse_mapping(pairs):
+    mapping = {}
+    for pair in pairs:
+        name, sep, column = pair.partition('=')
+        if not sep or name not in INPUT_COLUMNS:
+            raise argparse.ArgumentTypeError('--map expects one of %s=<input column>, got %r'
+                                             % ('/'.join(INPUT_COLUMNS), pair))
+        mapping[name] = column
+    return mapping
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bpviz', description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    score_parser = commands.add_parser('score', help='score a CSV/Parquet file of BP readings')
+    score_parser.add_argument('input', help='CSV, Parquet or Arrow file in the nhanes_clean.csv schema')
+    score_parser.add_argument('output', help='CSV or Parquet file to write (format from extension)')
+    score_parser.add_argument('--map', action='append', default=[], metavar='COLUMN=INPUT',
+                              help='read a standard column (e.g. RIAGENDR) from a differently named input column')
+    score_parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows per chunk')
+    score_parser.add_argument('--workers', type=int, default=1, help='processes to score chunks in')
+    score_parser.add_argument('--mode', choices=MODES, default='nearest',
+                              help='nearest table cell (default) or linear age/height interpolation')
+    score_parser.add_argument('--average', action='store_true',
+                              help='score the mean of the repeat readings (BPXSY1-3, BPXOSY1-3, ...) instead of BPXSY1/BPXDI1')
+
+    visits_parser = commands.add_parser('add-visits', help='append a CSV/Parquet file of visits to the visit store')
+    visits_parser.add_argument('input', help='CSV or Parquet file in the nhanes_clean.csv schema')
+    visits_parser.add_argument('--store', default=VISITS_DIR, help='visit store directory')
+    visits_parser.add_argument('--map', action='append', default=[], metavar='COLUMN=INPUT',
+                               help='read a standard column (e.g. RIAGENDR) from a differently named input column')
+    visits_parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows per appended segment')
+
+    compact_parser = commands.add_parser('compact', help='convert a cleaned NHANES CSV to the compact Arrow format')
+    compact_parser.add_argument('input', nargs='?', default=os.path.splitext(storage.ARROW_PATH)[0] + '.csv')
+    compact_parser.add_argument('output', nargs='?', default=storage.ARROW_PATH)
+
+    serve_parser = commands.add_parser('serve', help='run the HTTP scoring service (needs uvicorn)')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+
+    args = parser.parse_args(argv)
+    if args.command == 'compact':
+        storage.convert(args.input, args.output)
+        return 0
+    if args.command == 'serve':
+        return serve(args.host, args.port, args.workers)
+    try:
+        mapping = _parse_mapping(args.map)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if args.command == 'add-visits':
+        rows = add_visits(args.input, args.store, mapping, args.chunksize)
+        print('Added %d visits to %s' % (rows, args.store), file=sys.stderr)
+        return 0
+    with metrics.profiled('cli_score'), metrics.timer('score_file'):
+        rows = score_file(args.input, args.output, mapping, args.chunksize, args.workers, args.mode, args.average)
+    print('Scored %d rows into %s' % (rows, args.output), file=sys.stderr)
+    if metrics.ENABLED:
+        sys.stderr.write(metrics.render())
+    return 0
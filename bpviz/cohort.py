@@ -0,0 +1,137 @@
+"""Pre-binned cohort summaries of the NHANES pediatric subset.
+
+Summaries are computed per cycle at ingest time and stored as one small
+tidy table of counts by (CYCLE, Sex, Age, Measure, Status, Bin), where Bin
+is the lower edge of a 5-point percentile bin. Prevalence by age/sex/cycle
+and percentile histograms are sums over this table, so the dashboard never
+touches individual rows. Adding a cycle only replaces that cycle's rows.
+
+Next to the table, a small JSON file records a fingerprint of each cycle:
+a hash of the rows it was computed from plus a key of the tables and grid
+it was scored against. refresh_file() recomputes exactly the cycles whose
+fingerprint changed, so changes to merging, averaging, quality rules or
+scoring reach the summary without rebuilding it by hand.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from bpviz import grid, tables
+from bpviz.percentiles import score
+
+SUMMARY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nhanes', 'cohort_summary.csv')
+SUMMARY_COLUMNS = ['CYCLE', 'Sex', 'Age', 'Measure', 'Status', 'Bin', 'Count']
+PEDIATRIC_MAX_AGE = 13
+BIN_WIDTH = 5
+# Columns of a cycle's merged frame that summarize() reads
+INPUT_COLUMNS = ['RIAGENDR', 'RIDAGEYR', 'BMXHT', 'SBP_AVG', 'DBP_AVG']
+
+
+def summarize(frame, cycle):
+    """Counts of scored pediatric readings in one cycle's merged frame."""
+    pedi = frame[frame['RIDAGEYR'] <= PEDIATRIC_MAX_AGE]
+    scores = score(pedi['RIAGENDR'], pedi['RIDAGEYR'], pedi['BMXHT'], pedi['SBP_AVG'], pedi['DBP_AVG'])
+    parts = []
+    for measure, prefix in (('Systolic BP', 'SBP'), ('Diastolic BP', 'DBP')):
+        perc = scores[prefix + ' Percentile']
+        scored = ~np.isnan(perc)
+        parts.append(pd.DataFrame({
+            'Sex': np.where(pedi['RIAGENDR'].to_numpy()[scored] == 1, 'M', 'F'),
+            'Age': np.floor(pedi['RIDAGEYR'].to_numpy()[scored]).astype(int),
+            'Measure': measure,
+            'Status': scores[prefix + ' Status'][scored],
+            'Bin': np.minimum(perc[scored] // BIN_WIDTH * BIN_WIDTH, 100 - BIN_WIDTH).astype(int),
+        }))
+    rows = pd.concat(parts, ignore_index=True)
+    counts = rows.groupby(SUMMARY_COLUMNS[1:-1]).size().rename('Count').reset_index()
+    counts.insert(0, 'CYCLE', cycle)
+    return counts[SUMMARY_COLUMNS]
+
+
+def update(summary, cycle_frames):
+    """Replace the rows of the given cycles ({cycle: merged frame}) in a summary table."""
+    fresh = [summarize(frame, cycle) for cycle, frame in cycle_frames.items()]
+    if summary is not None:
+        fresh.insert(0, summary[~summary['CYCLE'].isin(list(cycle_frames))])
+    return pd.concat(fresh, ignore_index=True).sort_values(SUMMARY_COLUMNS[:-1], kind='stable').reset_index(drop=True)
+
+
+def load(path=SUMMARY_PATH):
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, dtype={'CYCLE': str})
+
+
+def update_file(cycle_frames, path=SUMMARY_PATH):
+    """Update the summary table on disk with the given cycles."""
+    summary = update(load(path), cycle_frames)
+    summary.to_csv(path, index=False)
+    return summary
+
+
+def fingerprints_path(path=SUMMARY_PATH):
+    return os.path.splitext(path)[0] + '_fingerprints.json'
+
+
+def load_fingerprints(path=SUMMARY_PATH):
+    """{cycle: fingerprint} stored next to the summary table, empty if there is none."""
+    try:
+        with open(fingerprints_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def scoring_key(table_dir=tables.TABLE_DIR):
+    """Hash of the tables, the percentile grid and the binning that summaries depend on."""
+    percentile_grid, status_grid = grid.load(table_dir)
+    digest = hashlib.sha1(repr((PEDIATRIC_MAX_AGE, BIN_WIDTH)).encode())
+    for array in (tables.load(table_dir), percentile_grid, status_grid):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint(frame, key):
+    """Hash of a cycle's summary inputs, under a scoring_key()."""
+    digest = hashlib.sha1(key.encode())
+    digest.update(pd.util.hash_pandas_object(frame[INPUT_COLUMNS], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def refresh_file(cycle_frames, path=SUMMARY_PATH):
+    """Bring the summary on disk up to date with {cycle: merged frame}.
+
+    Only cycles whose fingerprint differs from the stored one (or that have
+    none yet) are recomputed. Returns the names of the recomputed cycles.
+    """
+    summary = load(path)
+    stored = load_fingerprints(path) if summary is not None else {}
+    key = scoring_key()
+    current = {cycle: fingerprint(frame, key) for cycle, frame in cycle_frames.items()}
+    changed = {cycle: frame for cycle, frame in cycle_frames.items() if stored.get(cycle) != current[cycle]}
+    if changed or summary is None:
+        update_file(changed, path)
+        stored.update(current)
+        tmp_path = fingerprints_path(path) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(stored, f, indent=1, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, fingerprints_path(path))
+    return list(changed)
+
+
+def prevalence(summary, by=('Age',)):
+    """Share of readings in each status, grouped by the given columns."""
+    by = list(by)
+    counts = summary.groupby(by + ['Status'])['Count'].sum().reset_index()
+    counts['Share'] = counts['Count'] / counts.groupby(by)['Count'].transform('sum')
+    return counts
+
+
+def histogram(summary, by=()):
+    """Counts per percentile bin, grouped by the given columns."""
+    return summary.groupby(list(by) + ['Bin'])['Count'].sum().reset_index()
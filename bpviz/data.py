@@ -0,0 +1,115 @@
+"""Process-wide cached access to the NHANES data used by the Streamlit pages.
+
+Modules are imported once per Streamlit server process, so everything cached
+here is shared by all sessions and reruns. Entries are keyed on the file's
+mtime and size and are reloaded as soon as the file changes on disk.
+Returned frames are shared: callers must not modify them in place.
+"""
+
+import os
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+from bpviz import cohort, metrics, quality, storage
+from bpviz.patients import PatientIndex
+from bpviz.readings import average_readings
+from bpviz.visits import VISITS_DIR, VisitStore
+
+NHANES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nhanes', 'nhanes_clean.csv')
+NHANES_ARROW = storage.ARROW_PATH
+PEDIATRIC_MAX_AGE = 13
+
+Pediatric = namedtuple('Pediatric', ['frame', 'index'])
+
+_cache = {}
+_lock = threading.RLock()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def cached(name, path, loader):
+    """Return loader(path), recomputing only when the file at path has changed."""
+    key = _file_key(path)
+    entry = _cache.get((name, path))
+    if entry is not None and entry[0] == key:
+        metrics.count('cache_hits', cache=name)
+        return entry[1]
+    with _lock:
+        entry = _cache.get((name, path))
+        if entry is None or entry[0] != key:
+            metrics.count('cache_misses', cache=name)
+            with metrics.timer('load_' + name):
+                entry = (key, loader(path))
+            _cache[name, path] = entry
+    return entry[1]
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def default_path():
+    """The compact Arrow file when it was built from the current CSV, otherwise the CSV."""
+    if storage.built_from(NHANES_ARROW, NHANES_CSV):
+        return NHANES_ARROW
+    return NHANES_CSV
+
+
+def _read_nhanes(path):
+    if path.endswith('.arrow'):
+        nhanes = storage.read(path)
+    else:
+        nhanes = pd.read_csv(path)
+        nhanes['SEQN'] = nhanes['SEQN'].astype(int)
+    if 'SBP_AVG' not in nhanes:
+        # Files written before repeat readings were kept: the average is the one reading
+        nhanes = nhanes.assign(**average_readings(nhanes))
+    if quality.QUALITY_COLUMN not in nhanes:
+        # Files written before the ingest quality rules
+        nhanes, _ = quality.apply(nhanes)
+    return nhanes
+
+
+def nhanes(path=None):
+    """The cleaned NHANES frame with integer SEQN and QUALITY_OK, from the Arrow file or CSV."""
+    return cached('nhanes', path or default_path(), _read_nhanes)
+
+
+def _build_pediatric(path):
+    full = nhanes(path)
+    frame = full[full[quality.QUALITY_COLUMN] & (full['RIDAGEYR'] <= PEDIATRIC_MAX_AGE)].sort_values('SEQN', kind='stable')
+    frame = frame.drop_duplicates('SEQN').reset_index(drop=True)
+    return Pediatric(frame, PatientIndex(frame['SEQN'].to_numpy()))
+
+
+def pediatric(path=None):
+    """Children aged 13 and under who pass the quality rules, sorted by SEQN, with a searchable SEQN index."""
+    return cached('pediatric', path or default_path(), _build_pediatric)
+
+
+def patient(seqn, path=None):
+    """Row of one pediatric patient, or None if the SEQN is unknown."""
+    pedi = pediatric(path)
+    with metrics.timer('patient_lookup'):
+        offset = pedi.index.offset(seqn)
+    return None if offset is None else pedi.frame.iloc[offset]
+
+
+def cohort_summary(path=cohort.SUMMARY_PATH):
+    """The pre-binned cohort summary table written at ingest time, or None if ingest has not run."""
+    if not os.path.exists(path):
+        return None
+    return cached('cohort_summary', path, cohort.load)
+
+
+def visit_store(directory=VISITS_DIR):
+    """The visit store, reloaded when segments are added or compacted; None if there is none."""
+    if not os.path.isdir(directory):
+        return None
+    return cached('visits', directory, VisitStore)
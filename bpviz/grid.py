@@ -0,0 +1,71 @@
+"""Precomputed percentile and status for every whole-mmHg reading.
+
+Readings are integers in a narrow range and the tables only have
+2 sexes x 2 measures x 17 ages (1-17) x 7 height columns, so every cell is
+computed once for BP 0..255 and saved next to the tables as two small
+arrays that workers memory-map:
+
+    bp_grid_percentile.npy  float32, [sex, measure, age, height column, BP]
+    bp_grid_status.npy      uint8 index into STATUS_LABELS (same shape)
+
+Percentiles are stored to float32 precision (about 1e-5 points) and the
+statuses are taken from those stored values. Both percentiles() and score()
+read whole-mmHg readings from the grid in nearest mode, so they always
+agree. Fractional readings (e.g. averages of repeat readings), readings
+outside 0..255 and mode='linear' are not in the grid and are calculated
+exactly by bpviz.percentiles.
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from bpviz import tables
+from bpviz.tables import TABLE_DIR
+
+PERCENTILE_NAME = 'bp_grid_percentile.npy'
+STATUS_NAME = 'bp_grid_status.npy'
+BP_VALUES = 256
+PERCENTILE_DTYPE = np.float32
+
+Grid = namedtuple('Grid', ['percentile', 'status'])
+
+_loaded = {}
+
+
+def build(table_dir=TABLE_DIR):
+    """Compute the grid from the compiled tables; returns a Grid of in-memory arrays."""
+    from bpviz.percentiles import calc_percentile, status_codes
+
+    tensor = tables.load(table_dir)
+    bp = np.arange(BP_VALUES, dtype=float)
+    percentile = calc_percentile(bp, tensor[..., tables.P50, None], tensor[..., tables.P95, None]).astype(PERCENTILE_DTYPE)
+    return Grid(percentile, status_codes(percentile).astype(np.uint8))
+
+
+def load(table_dir=TABLE_DIR, use_cache=True):
+    """Return the grid, memory-mapping the .npy files when they are newer than the tables."""
+    if table_dir in _loaded:
+        return _loaded[table_dir]
+    paths = [os.path.join(table_dir, name) for name in (PERCENTILE_NAME, STATUS_NAME)]
+    grid = None
+    if use_cache and not any(tables.is_stale(path, table_dir) for path in paths):
+        grid = Grid(*(np.load(path, mmap_mode='r') for path in paths))
+        if grid.percentile.dtype != PERCENTILE_DTYPE:
+            grid = None  # written by an older version with a different precision
+    if grid is None:
+        grid = build(table_dir)
+        if use_cache:
+            try:
+                for path, array in zip(paths, grid):
+                    np.save(path, array)
+            except OSError:
+                pass  # read-only deployments just keep the in-memory copy
+    _loaded[table_dir] = grid
+    return grid
+
+
+def in_grid(bp):
+    """Which readings are whole mmHg within the grid (False for NaN)."""
+    return (bp >= 0) & (bp < BP_VALUES) & (bp == np.floor(bp))
@@ -0,0 +1,203 @@
+"""NHANES XPT ingestion with a per-file columnar cache.
+
+Each cycle's BMX/BPX/DEMO files are decoded in a process pool by the
+streaming XPT reader, which only decodes the requested columns, and the
+projected frames are cached as Parquet keyed by file hash and mtime.
+Rebuilding after adding a cycle only decodes the new or changed files.
+The merged rows are checked against the bpviz.quality rules, which add a
+QUALITY_OK column.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bpviz import cohort, quality, xpt
+from bpviz.readings import AVERAGE_COLUMNS, READING_COLUMNS, average_readings
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nhanes')
+CACHE_DIRNAME = '.cache'
+MANIFEST_NAME = 'manifest.json'
+
+BODY_COLUMNS = ['SEQN', 'BMXWT', 'BMXHT']    # Not including 'BMDSTATS' due to incomplete data
+BP_COLUMNS = ['SEQN'] + READING_COLUMNS    # Auscultatory and oscillometric readings 1-3, whichever the file has
+DEMO_COLUMNS = ['SEQN', 'RIAGENDR', 'RIDAGEYR', 'RIDAGEMN', 'RIDEXAGM']
+
+# RIDEXAGM (age in months at exam) is only recorded below this age
+ADULT_AGE = 20
+
+# (cycle, body measures, blood pressure files, demographics), oldest first
+CYCLES = [
+    ('1999-2000', 'BMX.XPT', ('BPX.XPT',), 'DEMO.XPT'),
+    ('2001-2002', 'BMX_B.XPT', ('BPX_B.XPT',), 'DEMO_B.XPT'),
+    ('2003-2004', 'BMX_C.XPT', ('BPX_C.XPT',), 'DEMO_C.XPT'),
+    ('2005-2006', 'BMX_D.XPT', ('BPX_D.XPT',), 'DEMO_D.XPT'),
+    ('2007-2008', 'BMX_E.XPT', ('BPX_E.XPT',), 'DEMO_E.XPT'),
+    ('2009-2010', 'BMX_F.XPT', ('BPX_F.XPT',), 'DEMO_F.XPT'),
+    ('2011-2012', 'BMX_G.XPT', ('BPX_G.XPT',), 'DEMO_G.XPT'),
+    ('2013-2014', 'BMX_H.XPT', ('BPX_H.XPT',), 'DEMO_H.XPT'),
+    ('2015-2016', 'BMX_I.XPT', ('BPX_I.XPT',), 'DEMO_I.XPT'),
+    ('2017-2018', 'BMX_J.XPT', ('BPX_J.XPT', 'BPXO_J.XPT'), 'DEMO_J.XPT'),
+    ('2017-2020', 'P_BMX.XPT', ('P_BPXO.XPT',), 'P_DEMO.XPT'),
+]
+
+# Output columns, in order
+COLUMNS = ['SEQN', 'BMXWT', 'BMXHT', 'RIAGENDR', 'RIDAGEYR', 'RIDAGEMN'] + READING_COLUMNS + AVERAGE_COLUMNS
+
+
+def _files(cycle):
+    _, body, bp_files, demo = cycle
+    return (body,) + tuple(bp_files) + (demo,)
+
+
+def read_xpt(path, columns=None):
+    """Read an XPT file, decoding only the wanted columns."""
+    return xpt.read(path, columns)
+
+
+def file_hash(path, blocksize=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_key(name, sha1, columns):
+    projection = hashlib.sha1(','.join(columns).encode()).hexdigest()[:8]
+    return '%s-%s-%s.parquet' % (os.path.splitext(name)[0], sha1[:16], projection)
+
+
+def _decode(path, columns, cache_path):
+    frame = read_xpt(path, columns)
+    frame.to_parquet(cache_path, index=False)
+    return cache_path
+
+
+class Cache:
+    """Manifest of decoded files: name -> {mtime, size, sha1, parquet}."""
+
+    def __init__(self, data_dir=DATA_DIR, cache_dir=None):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir or os.path.join(data_dir, CACHE_DIRNAME)
+        self.manifest_path = os.path.join(self.cache_dir, MANIFEST_NAME)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def save(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def lookup(self, name, columns):
+        """Return (cache path, fresh) for a data file; fresh means no decode is needed."""
+        path = os.path.join(self.data_dir, name)
+        stat = os.stat(path)
+        entry = self.manifest.get(name, {})
+        if entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+            sha1 = entry['sha1']
+        else:
+            # mtime changed: only re-decode if the contents really did
+            sha1 = file_hash(path)
+        cache_path = os.path.join(self.cache_dir, _cache_key(name, sha1, columns))
+        self.manifest[name] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': sha1}
+        return cache_path, os.path.exists(cache_path)
+
+
+def load_files(requests, data_dir=DATA_DIR, cache_dir=None, workers=None):
+    """Decode {name: columns} into {name: DataFrame}, in parallel and through the cache.
+
+    Returns the frames and the set of names that had to be decoded.
+    """
+    cache = Cache(data_dir, cache_dir)
+    paths, pending = {}, {}
+    for name, columns in requests.items():
+        paths[name], fresh = cache.lookup(name, columns)
+        if not fresh:
+            pending[name] = columns
+    if len(pending) == 1 or workers == 1:
+        for name, columns in pending.items():
+            _decode(os.path.join(data_dir, name), columns, paths[name])
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_decode, os.path.join(data_dir, name), columns, paths[name])
+                       for name, columns in pending.items()]
+            for future in futures:
+                future.result()
+    cache.save()
+    return {name: pd.read_parquet(path) for name, path in paths.items()}, set(pending)
+
+
+def merge_cycle(body_measures, blood_pressures, demographics):
+    """Join one cycle's body measures, BP readings (one frame per BP file) and demographics.
+
+    Age in months comes from RIDEXAGM (age at exam, recorded for under-20s
+    since 2011) or RIDAGEMN. Children under 20 with neither, as in 2017-2020,
+    get the middle of their completed year (RIDAGEYR + 0.5), so an age cutoff
+    or the rounding to table rows treats them like the other cycles'. Adult
+    ages without months stay whole years, keeping NHANES' 80/85+ top codes.
+    Visits without any BP reading are dropped.
+    """
+    body_measures = body_measures.dropna()
+    demographics = demographics.dropna(subset=['RIAGENDR', 'RIDAGEYR']).copy()
+    if 'RIDEXAGM' in demographics:
+        demographics['RIDAGEMN'] = demographics['RIDEXAGM'].fillna(demographics['RIDAGEMN'])
+    months = demographics['RIDAGEMN']
+    years = demographics['RIDAGEYR']
+    demographics['RIDAGEYR'] = (months / 12).fillna(years + np.where(years < ADULT_AGE, 0.5, 0))
+
+    readings = blood_pressures[0]
+    for extra in blood_pressures[1:]:
+        readings = pd.merge(readings, extra, on='SEQN', how='outer')
+    readings = readings.reindex(columns=['SEQN'] + READING_COLUMNS)
+    readings = readings.dropna(subset=READING_COLUMNS, how='all')
+
+    merged = pd.merge(body_measures, demographics, on='SEQN', how='inner')
+    merged = pd.merge(merged, readings, on='SEQN', how='inner')
+    merged = merged.assign(**average_readings(merged))
+    return merged[COLUMNS]
+
+
+def build(data_dir=DATA_DIR, cycles=CYCLES, cache_dir=None, workers=None, summary_path=None, report_path=None):
+    """Build the cleaned NHANES frame from every cycle whose files are all present.
+
+    Every row is kept, with QUALITY_OK marking the rows that pass the
+    bpviz.quality rules; report_path, if given, receives the per-rule
+    rejection counts as CSV.
+
+    With summary_path, the cohort summary table there is also brought up to
+    date from the rows that pass, recomputing only cycles whose rows or
+    scoring changed since they were summarized (see cohort.refresh_file).
+    """
+    available = [cycle for cycle in cycles
+                 if all(os.path.exists(os.path.join(data_dir, name)) for name in _files(cycle))]
+    requests = {}
+    for _, body, bp_files, demo in available:
+        requests[body] = BODY_COLUMNS
+        requests[demo] = DEMO_COLUMNS
+        for bp in bp_files:
+            requests[bp] = BP_COLUMNS
+    frames, _ = load_files(requests, data_dir, cache_dir, workers)
+
+    merged = {}
+    for cycle, body, bp_files, demo in available:
+        merged[cycle] = merge_cycle(frames[body], [frames[bp] for bp in bp_files], frames[demo])
+    nhanes, rejections = quality.apply(pd.concat(list(merged.values()), ignore_index=True))
+    if report_path is not None:
+        rejections.to_csv(report_path, index=False)
+
+    if summary_path is not None:
+        # Split the quality mask back into cycles; the concatenation kept their order
+        masks = np.split(nhanes[quality.QUALITY_COLUMN].to_numpy(), np.cumsum([len(f) for f in merged.values()])[:-1])
+        passed = {cycle: frame[mask] for (cycle, frame), mask in zip(merged.items(), masks)}
+        cohort.refresh_file(passed, summary_path)
+    return nhanes
@@ -0,0 +1,57 @@
+"""Continuous age/height interpolation of the bp-tables.
+
+Instead of snapping to the rounded age and the nearest height column, the
+50th and 95th percentile BP are treated as piecewise-linear in height within
+each age and linear in age between the tabulated years. The segment
+coefficients (intercepts and slopes) are computed once per table set, so
+evaluating any fractional age and height is a bracket search plus a few
+multiply-adds.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from bpviz import tables
+
+Coefficients = namedtuple('Coefficients', ['tensor', 'knots', 'intercepts', 'slopes'])
+
+_coefficients = {}
+
+
+def coefficients(table_dir=tables.TABLE_DIR):
+    """Per [sex, measure, age, height segment] intercepts and slopes for the 50th and 95th rows."""
+    if table_dir in _coefficients:
+        return _coefficients[table_dir]
+    tensor = tables.load(table_dir)
+    knots = np.asarray(tensor[..., tables.HEIGHT_CM])
+    values = np.stack([tensor[..., tables.P50], tensor[..., tables.P95]], axis=-1)
+    slopes = np.diff(values, axis=-2) / np.diff(knots, axis=-1)[..., None]
+    intercepts = values[..., :-1, :] - slopes * knots[..., :-1, None]
+    result = Coefficients(tensor, knots, intercepts, slopes)
+    _coefficients[table_dir] = result
+    return result
+
+
+def _at_age(coef, sex, measure, age_idx, height):
+    # Heights outside the table are held at the first/last column's values
+    lo = coef.knots[sex, measure, age_idx, 0]
+    hi = coef.knots[sex, measure, age_idx, -1]
+    height = np.clip(height, lo, hi)
+    segment = tables.height_bracket(coef.tensor, sex, measure, age_idx, height) - 1
+    index = (sex, measure, age_idx, segment)
+    return coef.intercepts[index] + coef.slopes[index] * height[..., None]
+
+
+def interpolate(sex, measure, age, height, table_dir=tables.TABLE_DIR):
+    """Return (bp50, bp95) at fractional age (years) and height (cm) for index arrays sex/measure.
+
+    Ages are clamped to the tabulated range; callers decide which ages are in scope.
+    """
+    coef = coefficients(table_dir)
+    n_ages = coef.knots.shape[2]
+    position = np.clip(age - tables.MIN_AGE, 0, n_ages - 1)
+    lower = np.minimum(np.floor(position).astype(int), n_ages - 2)
+    weight = (position - lower)[..., None]
+    values = (1 - weight) * _at_age(coef, sex, measure, lower, height) + weight * _at_age(coef, sex, measure, lower + 1, height)
+    return values[..., 0], values[..., 1]
@@ -0,0 +1,189 @@
+"""Per-stage timing histograms and counters, exported in Prometheus text format.
+
+Collection is off unless BPVIZ_METRICS=1 is set (or enable() is called):
+
+    with metrics.timer('score'):
+        ...
+    metrics.count('rows_scored', len(bp))
+
+When it is off, timer() hands back a shared no-op context manager and
+count() returns straight away, so instrumented code costs one flag check.
+
+BPVIZ_PROFILE=<directory> additionally runs the profiled() blocks (a
+Streamlit rerun, a CLI scoring run, a service batch) under cProfile; the
+stats are accumulated per block name and written to
+<directory>/<name>-<pid>.prof when the process exits.
+"""
+
+import atexit
+import bisect
+import cProfile
+import functools
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the histogram buckets, as in the Prometheus client defaults
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'bpviz_'
+
+ENABLED = os.environ.get('BPVIZ_METRICS', '') not in ('', '0')
+PROFILE_DIR = os.environ.get('BPVIZ_PROFILE') or None
+
+_histograms = {}
+_counters = {}
+_profiles = {}
+_lock = threading.Lock()
+
+
+def enable(on=True):
+    """Turn collection on or off for this process."""
+    global ENABLED
+    ENABLED = bool(on)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def observe(stage, seconds):
+    """Record one duration for a stage."""
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [[0] * (len(BUCKETS) + 1), 0.0]
+        histogram[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+
+
+def count(name, value=1, **labels):
+    """Add value to a counter, e.g. count('cache_hits', cache='nhanes')."""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL = _Null()
+
+
+def timer(stage):
+    """Context manager timing a block into the stage's histogram."""
+    return _Timer(stage) if ENABLED else _NULL
+
+
+def timed(stage):
+    """Decorator form of timer()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Profiled:
+    __slots__ = ('profile', 'active')
+
+    def __init__(self, name):
+        with _lock:
+            self.profile = _profiles.get(name)
+            if self.profile is None:
+                self.profile = _profiles[name] = cProfile.Profile()
+
+    def __enter__(self):
+        try:
+            self.profile.enable()
+            self.active = True
+        except ValueError:
+            self.active = False  # another profiler is already running (nested or concurrent block)
+        return self
+
+    def __exit__(self, *exc):
+        if self.active:
+            self.profile.disable()
+
+
+def profiled(name):
+    """Context manager running a block under cProfile when BPVIZ_PROFILE is set."""
+    return _Profiled(name) if PROFILE_DIR else _NULL
+
+
+def dump_profiles(directory=None):
+    """Write the accumulated cProfile stats; returns the paths written."""
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    with _lock:
+        for name, profile in _profiles.items():
+            path = os.path.join(directory, '%s-%d.prof' % (name, os.getpid()))
+            profile.dump_stats(path)
+            paths.append(path)
+    return paths
+
+
+if PROFILE_DIR:
+    atexit.register(dump_profiles)
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+
+
+def render():
+    """All histograms and counters in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {stage: (list(buckets), total) for stage, (buckets, total) in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    if histograms:
+        name = PREFIX + 'stage_seconds'
+        lines += ['# HELP %s Time spent in each instrumented stage.' % name, '# TYPE %s histogram' % name]
+        for stage in sorted(histograms):
+            buckets, total = histograms[stage]
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += n
+                lines.append('%s_bucket%s %d' % (name, _labels([('stage', stage), ('le', bound)]), cumulative))
+            lines.append('%s_sum%s %r' % (name, _labels([('stage', stage)]), total))
+            lines.append('%s_count%s %d' % (name, _labels([('stage', stage)]), cumulative))
+    for counter in sorted({name for name, _ in counters}):
+        name = PREFIX + counter + '_total'
+        lines.append('# TYPE %s counter' % name)
+        for (key, labels), value in sorted(counters.items()):
+            if key == counter:
+                lines.append('%s%s %s' % (name, _labels(labels), value))
+    return '\n'.join(lines) + '\n'
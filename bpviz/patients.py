@@ -0,0 +1,85 @@
+"""Searchable index of patient IDs (NHANES SEQN).
+
+Keeps the IDs in a sorted array plus a hash map to row offsets, so exact
+lookups are O(1) and prefix/range searches are a handful of binary searches.
+Results come back one page at a time, so a UI never needs the full list.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+PAGE_SIZE = 25
+
+Page = namedtuple('Page', ['items', 'total', 'page', 'pages'])
+
+
+class PatientIndex:
+
+    def __init__(self, seqns):
+        seqns = np.asarray(seqns, dtype=np.int64)
+        order = np.argsort(seqns, kind='stable')
+        self.seqns = seqns[order]
+        self.offsets = dict(zip(self.seqns.tolist(), order.tolist()))
+        self._max_digits = len(str(self.seqns[-1])) if len(self.seqns) else 0
+
+    def __len__(self):
+        return len(self.seqns)
+
+    def __contains__(self, seqn):
+        return self.offset(seqn) is not None
+
+    def offset(self, seqn):
+        """Row offset of a SEQN in the indexed frame, or None."""
+        try:
+            return self.offsets.get(int(seqn))
+        except (TypeError, ValueError):
+            return None
+
+    def _bounds(self, lo, hi):
+        # Positions of the IDs with lo <= seqn <= hi
+        return (int(np.searchsorted(self.seqns, lo, side='left')),
+                int(np.searchsorted(self.seqns, hi, side='right')))
+
+    def _page(self, spans, page, page_size):
+        total = sum(end - start for start, end in spans)
+        pages = max(1, math.ceil(total / page_size))
+        page = min(max(page, 1), pages)
+        skip, items = (page - 1) * page_size, []
+        for start, end in spans:
+            if skip >= end - start:
+                skip -= end - start
+                continue
+            take = self.seqns[start + skip:end][:page_size - len(items)]
+            items.extend(take.tolist())
+            skip = 0
+            if len(items) == page_size:
+                break
+        return Page(items, total, page, pages)
+
+    def range(self, lo, hi, page=1, page_size=PAGE_SIZE):
+        """Page of IDs between lo and hi inclusive."""
+        return self._page([self._bounds(lo, hi)], page, page_size)
+
+    def prefix(self, prefix, page=1, page_size=PAGE_SIZE):
+        """Page of IDs whose decimal form starts with prefix, in ascending order."""
+        prefix = str(prefix).strip()
+        if not prefix:
+            return self._page([(0, len(self.seqns))], page, page_size)
+        if not prefix.isdigit() or prefix[0] == '0':
+            # SEQNs are written without leading zeros, so nothing can match "0..."
+            return Page([], 0, 1, 1)
+        # IDs starting with "65" are 65, 650-659, 6500-6599, ...: one sorted span per length
+        head = int(prefix)
+        spans = [self._bounds(head * 10 ** k, (head + 1) * 10 ** k - 1)
+                 for k in range(self._max_digits - len(prefix) + 1)]
+        return self._page(spans, page, page_size)
+
+    def search(self, query, page=1, page_size=PAGE_SIZE):
+        """Search by prefix ("65") or inclusive range ("6500-6600")."""
+        query = str(query).strip()
+        lo, sep, hi = query.partition('-')
+        if sep and lo.strip().isdigit() and hi.strip().isdigit():
+            return self.range(int(lo), int(hi), page, page_size)
+        return self.prefix(query, page, page_size)
@@ -0,0 +1,74 @@
+"""In-process version of the pedbp ``p_bp()`` call made by calculate_bp_percentiles.R.
+
+Takes the same inputs as the R script (q_sbp, q_dbp, age in months, male
+0/1, height in cm), vectorized over arrays, and returns percentiles on
+pedbp's 0-1 scale. Like pedbp's Flynn et al. (2017) branch, each reading is
+scored against a normal distribution with mean at the tabulated 50th
+percentile and sd recovered from the 95th. Two deliberate differences:
+the height column is the nearest tabulated height rather than a CDC
+height-for-age percentile, and ages under 12 months (covered in pedbp by
+Gemelli 1990, which is not in bp-tables) return NaN.
+
+The R script is kept as an optional cross-validation backend; ``p_bp_r``
+calls it once per batch through a CSV file instead of once per row.
+"""
+
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+from bpviz import tables
+from bpviz.percentiles import calc_percentile
+
+R_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'calculate_bp_percentiles.R')
+
+# pedbp assumes a median height when none is given
+DEFAULT_HEIGHT_COLUMN = tables.HEIGHT_PERCENTILES.index(50)
+
+
+def p_bp(q_sbp, q_dbp, age, male, height=None, table_dir=tables.TABLE_DIR):
+    """Return {'sbp_percentile', 'dbp_percentile'} arrays (0-1) like pedbp::p_bp."""
+    tensor = tables.load(table_dir)
+    if height is None:
+        height = np.nan
+    q_sbp, q_dbp, age, male, height = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (q_sbp, q_dbp, age, male, height)))
+
+    # Tables are by completed year of age
+    age_idx = np.floor(np.nan_to_num(age, nan=-1) / 12).astype(int) - tables.MIN_AGE
+    valid = (age_idx >= 0) & (age_idx < tensor.shape[2]) & np.isin(male, (0, 1))
+    a = np.where(valid, age_idx, 0)
+    s = np.where(male == 1, 0, 1)
+
+    result = {}
+    for name, m, q in (('sbp_percentile', 0, q_sbp), ('dbp_percentile', 1, q_dbp)):
+        col = tables.height_column(tensor, s, m, a, np.nan_to_num(height))
+        col = np.where(np.isnan(height), DEFAULT_HEIGHT_COLUMN, col)
+        perc = calc_percentile(q, tensor[s, m, a, col, tables.P50], tensor[s, m, a, col, tables.P95]) / 100
+        result[name] = np.where(valid, perc, np.nan)
+    return result
+
+
+def p_bp_r(q_sbp, q_dbp, age, male, height=None, rscript='Rscript', script=R_SCRIPT):
+    """Run the R pedbp backend once for a whole batch (needs R with pedbp and jsonlite)."""
+    import pandas as pd
+
+    batch = pd.DataFrame({'q_sbp': q_sbp, 'q_dbp': q_dbp, 'age': age, 'male': male,
+                          'height': np.nan if height is None else height})
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'input.csv')
+        output_path = os.path.join(tmp, 'output.csv')
+        batch.to_csv(input_path, index=False, na_rep='NA')
+        subprocess.run([rscript, script, '--file', input_path, output_path], check=True,
+                       stdout=subprocess.DEVNULL)
+        output = pd.read_csv(output_path)
+    return {name: output[name].to_numpy(dtype=float) for name in ('sbp_percentile', 'dbp_percentile')}
+
+
+def compare(q_sbp, q_dbp, age, male, height=None, **kwargs):
+    """Largest absolute difference between the Python and R results, per measure."""
+    ours = p_bp(q_sbp, q_dbp, age, male, height)
+    theirs = p_bp_r(q_sbp, q_dbp, age, male, height, **kwargs)
+    return {name: float(np.nanmax(np.abs(ours[name] - theirs[name]))) for name in ours}
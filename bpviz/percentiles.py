@@ -0,0 +1,184 @@
+"""Vectorized blood pressure percentile engine.
+
+Scores whole arrays of children against the bp-tables in one NumPy pass
+instead of re-filtering the tables once per row.
+"""
+
+import math
+
+import numpy as np
+
+from bpviz import grid, interp, metrics, tables
+from bpviz.tables import TABLE_DIR
+
+STATUS_LABELS = ('Normal BP', 'Elevated BP', 'Hypertension')
+# Status code of an unscored reading (NaN percentile)
+NO_STATUS = len(STATUS_LABELS)
+_LABELS = np.array(STATUS_LABELS + ('',), dtype=object)
+MODES = ('nearest', 'linear')
+
+# z-score of the 95th percentile, used to recover sigma from the tables
+Z95 = 1.645
+
+# Above this many values the normal CDF is handed to scipy, if it is installed
+SCIPY_MIN_SIZE = 10000
+
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+
+def ndtr(z):
+    """Standard normal CDF without importing scipy for the small arrays the app scores."""
+    z = np.asarray(z, dtype=float)
+    if z.size >= SCIPY_MIN_SIZE:
+        try:
+            from scipy.special import ndtr as scipy_ndtr
+        except ImportError:
+            pass
+        else:
+            return scipy_ndtr(z)
+    return 0.5 * (1 + np.asarray(_erf(z / math.sqrt(2)), dtype=float))
+
+
+# Function to calculate percentile (works on scalars and arrays)
+def calc_percentile(value, percentile_50, percentile_95):
+    sigma = (np.asarray(percentile_95, dtype=float) - percentile_50) / Z95
+    return ndtr((np.asarray(value, dtype=float) - percentile_50) / sigma) * 100
+
+
+def _first_letters(values):
+    # Cast to one-character strings in C and compare code points; | 0x20 lower-cases ASCII letters
+    return np.asarray(values).astype('U1').view(np.uint32) | 0x20
+
+
+def sex_index(sex):
+    """Map 'M'/'Male'/1 to 0 and 'F'/'Female'/2 to 1 (NHANES RIAGENDR codes are accepted)."""
+    sex = np.asarray(sex)
+    if sex.dtype.kind in 'iuf':
+        return np.where(sex == 1, 0, np.where(sex == 2, 1, -1))
+    first = _first_letters(sex)
+    return np.where(first == ord('m'), 0, np.where(first == ord('f'), 1, -1))
+
+
+def measure_index(measure):
+    """Map 'Systolic BP'/'SBP' to 0 and 'Diastolic BP'/'DBP' to 1."""
+    first = _first_letters(measure)
+    return np.where(first == ord('s'), 0, np.where(first == ord('d'), 1, -1))
+
+
+def _cells(tensor, sex, measure, age, height, bp, mode):
+    """Broadcast the inputs and find each reading's table row; NaN-safe.
+
+    sex and measure are already indices (see sex_index/measure_index).
+    Returns (valid, sex, measure, age row, height column, age, height, bp),
+    where the indices are 0 for invalid readings and the height column is
+    None in linear mode.
+    """
+    age = np.asarray(age, dtype=float)
+    height = np.asarray(height, dtype=float)
+    bp = np.asarray(bp, dtype=float)
+    sex, measure, age, height, bp = np.broadcast_arrays(sex, measure, age, height, bp)
+
+    # Round the age to the table rows and flag anything we cannot look up
+    age_idx = np.rint(np.nan_to_num(age, nan=-1)).astype(int) - tables.MIN_AGE
+    valid = (sex >= 0) & (measure >= 0) & (age_idx >= 0) & (age_idx < tensor.shape[2]) & ~np.isnan(height)
+    s, m, a = (np.where(valid, x, 0) for x in (sex, measure, age_idx))
+    col = None
+    if mode == 'nearest':
+        with metrics.timer('table_lookup'):
+            col = tables.height_column(tensor, s, m, a, np.where(valid, height, 0))
+    return valid, s, m, a, col, age, height, bp
+
+
+def _exact(tensor, s, m, a, col, age, height, bp, valid, table_dir):
+    if col is None:
+        with metrics.timer('table_lookup'):
+            bp50, bp95 = interp.interpolate(s, m, np.where(valid, age, tables.MIN_AGE), np.where(valid, height, 0), table_dir)
+    else:
+        bp50, bp95 = tensor[s, m, a, col, tables.P50], tensor[s, m, a, col, tables.P95]
+    return calc_percentile(bp, bp50, bp95)
+
+
+def _check_mode(mode):
+    if mode not in MODES:
+        raise ValueError('mode must be one of %s, not %r' % (', '.join(MODES), mode))
+
+
+def percentiles(sex, measure, age, height, bp, table_dir=TABLE_DIR, mode='nearest'):
+    """Percentile (0-100) of each BP reading; NaN where the child is outside the tables.
+
+    mode='nearest' uses the rounded age and the closest height column, as the
+    published tables are read; mode='linear' interpolates in age and height.
+    In nearest mode whole-mmHg readings come from the precomputed grid, as in
+    score(), so they are float32-precise.
+    """
+    _check_mode(mode)
+    with metrics.timer('score'):
+        if mode == 'nearest':
+            result, _ = _grid_score(sex_index(sex), measure_index(measure), age, height, bp, table_dir)
+        else:
+            tensor = tables.load(table_dir)
+            valid, s, m, a, col, age, height, bp = _cells(tensor, sex_index(sex), measure_index(measure), age, height, bp, mode)
+            result = np.where(valid, _exact(tensor, s, m, a, col, age, height, bp, valid, table_dir), np.nan)
+    metrics.count('rows_scored', result.size)
+    return result
+
+
+def status_codes(percentile):
+    """Index into STATUS_LABELS of each percentile (NO_STATUS for NaN)."""
+    percentile = np.asarray(percentile, dtype=float)
+    return np.select([percentile <= 90, percentile <= 95, percentile > 95], [0, 1, 2], default=NO_STATUS)
+
+
+def status(percentile):
+    """Label percentiles as Normal (<=90), Elevated (<=95) or Hypertension; '' for NaN."""
+    return _LABELS[status_codes(percentile)]
+
+
+def _grid_score(sex, measure, age, height, bp, table_dir):
+    """Percentiles and status codes, read from the grid for whole-mmHg readings.
+
+    sex and measure are indices, as for _cells.
+    """
+    tensor = tables.load(table_dir)
+    percentile_grid, status_grid = grid.load(table_dir)
+    valid, s, m, a, col, age, height, bp = _cells(tensor, sex, measure, age, height, bp, 'nearest')
+    hit = valid & grid.in_grid(bp)
+    b = np.where(hit, bp, 0).astype(np.intp)
+    percentile = np.asarray(percentile_grid[s, m, a, col, b], dtype=float)
+    codes = np.asarray(status_grid[s, m, a, col, b])
+
+    # Fractional and out-of-range readings are calculated exactly
+    miss = valid & ~hit
+    if miss.any():
+        exact = _exact(tensor, s[miss], m[miss], a[miss], col[miss], None, None, bp[miss], None, table_dir)
+        percentile[miss] = exact
+        codes[miss] = status_codes(exact)
+    percentile[~valid] = np.nan
+    codes[~valid] = NO_STATUS
+    return percentile, codes
+
+
+def score(sex, age, height, sbp, dbp, table_dir=TABLE_DIR, mode='nearest'):
+    """Score systolic and diastolic readings together for arrays of children.
+
+    In nearest mode whole-mmHg readings are looked up in the precomputed
+    grid (see bpviz.grid), so their percentiles are float32-precise and
+    match percentiles() exactly.
+    """
+    _check_mode(mode)
+    if mode == 'linear':
+        sbp_perc = percentiles(sex, 'Systolic BP', age, height, sbp, table_dir, mode)
+        dbp_perc = percentiles(sex, 'Diastolic BP', age, height, dbp, table_dir, mode)
+        sbp_codes, dbp_codes = status_codes(sbp_perc), status_codes(dbp_perc)
+    else:
+        with metrics.timer('score'):
+            sex = sex_index(sex)
+            sbp_perc, sbp_codes = _grid_score(sex, 0, age, height, sbp, table_dir)
+            dbp_perc, dbp_codes = _grid_score(sex, 1, age, height, dbp, table_dir)
+        metrics.count('rows_scored', sbp_perc.size + dbp_perc.size)
+    return {
+        'SBP Percentile': sbp_perc,
+        'SBP Status': _LABELS[sbp_codes],
+        'DBP Percentile': dbp_perc,
+        'DBP Status': _LABELS[dbp_codes],
+    }
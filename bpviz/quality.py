@@ -0,0 +1,150 @@
+"""Data-quality rules for the cleaned NHANES frame.
+
+The rules are declared in RULES and evaluated together into one boolean
+matrix (rows x rules) at ingest time. The result is a QUALITY_OK column
+and a compact report of how many rows each rule rejected, so the rows that
+would feed garbage into the percentile calculation (a diastolic heard to
+zero on every reading, a measure never taken, impossible heights) are
+dropped once, before scoring, instead of being checked on every request.
+
+Missing values pass the range checks; a BP that was never taken is its
+own rule, apart from one heard to zero. Range, code and reading checks
+use whichever of their columns the frame has (as readings are averaged);
+other rules are skipped unless all their columns are present.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from bpviz import tables
+from bpviz.readings import AUSCULTATORY_DBP, AUSCULTATORY_SBP, OSCILLOMETRIC_DBP, OSCILLOMETRIC_SBP
+
+QUALITY_COLUMN = 'QUALITY_OK'
+
+SBP_COLUMNS = tuple(AUSCULTATORY_SBP + OSCILLOMETRIC_SBP)
+DBP_COLUMNS = tuple(AUSCULTATORY_DBP + OSCILLOMETRIC_DBP)
+
+# check is one of the keys of CHECKS; limits depend on the check
+Rule = namedtuple('Rule', ['name', 'check', 'columns', 'limits', 'description'])
+
+RULES = (
+    Rule('sex_code', 'isin', ('RIAGENDR',), (1, 2), 'sex not coded 1 (male) or 2 (female)'),
+    Rule('age_range', 'range', ('RIDAGEYR',), (0, 85), 'age outside 0-85 years'),
+    Rule('height_range', 'range', ('BMXHT',), (40, 220), 'height outside 40-220 cm'),
+    Rule('weight_range', 'range', ('BMXWT',), (2, 400), 'weight outside 2-400 kg'),
+    Rule('sbp_range', 'range', SBP_COLUMNS, (50, 300), 'a systolic reading outside 50-300 mmHg'),
+    Rule('dbp_zero', 'all_zero', DBP_COLUMNS, None, 'every diastolic reading taken is 0 (sounds heard to zero)'),
+    Rule('dbp_range', 'range', DBP_COLUMNS, (0, 150), 'a diastolic reading above 150 mmHg'),
+    Rule('bp_missing', 'none_taken', SBP_COLUMNS + DBP_COLUMNS, (SBP_COLUMNS, DBP_COLUMNS), 'no systolic or no diastolic reading taken'),
+    Rule('dbp_above_sbp', 'not_below', ('DBP_AVG', 'SBP_AVG'), None, 'average diastolic not below average systolic'),
+    Rule('height_for_age', 'height_for_age', ('RIAGENDR', 'RIDAGEYR', 'BMXHT'), (0.8, 1.2),
+         'height under 0.8x the 5th or over 1.2x the 95th percentile height for age and sex (ages 1-17)'),
+    Rule('duplicate_seqn', 'duplicate', ('SEQN',), None, 'SEQN already seen in an earlier cycle'),
+)
+
+
+def _values(frame, columns):
+    return np.column_stack([frame[col].to_numpy(dtype=float) for col in columns])
+
+
+def _range(frame, columns, limits):
+    values = _values(frame, columns)
+    with np.errstate(invalid='ignore'):
+        return ((values < limits[0]) | (values > limits[1])).any(axis=1)
+
+
+def _isin(frame, columns, allowed):
+    return ~np.isin(_values(frame, columns), allowed).all(axis=1)
+
+
+def _all_zero(frame, columns, _):
+    values = _values(frame, columns)
+    taken = ~np.isnan(values)
+    return taken.any(axis=1) & ((values == 0) | ~taken).all(axis=1)
+
+
+def _none_taken(frame, columns, groups):
+    # A group fails when none of its columns has a value (or the frame has none of them)
+    failed = np.zeros(len(frame), dtype=bool)
+    for group in groups:
+        present = [col for col in group if col in columns]
+        failed |= np.isnan(_values(frame, present)).all(axis=1) if present else True
+    return failed
+
+
+def _not_below(frame, columns, _):
+    lower, upper = _values(frame, columns).T
+    with np.errstate(invalid='ignore'):
+        return lower >= upper
+
+
+def _height_for_age(frame, columns, limits):
+    sex, age, height = _values(frame, columns).T
+    tensor = tables.load()
+    age_idx = np.rint(np.nan_to_num(age, nan=-1)).astype(int) - tables.MIN_AGE
+    known = np.isin(sex, (1, 2)) & (age_idx >= 0) & (age_idx < tensor.shape[2]) & ~np.isnan(height)
+    s, a = np.where(known, sex - 1, 0).astype(int), np.where(known, age_idx, 0)
+    heights = tensor[s, 0, a, :, tables.HEIGHT_CM]
+    return known & ((height < limits[0] * heights[:, 0]) | (height > limits[1] * heights[:, -1]))
+
+
+def _duplicate(frame, columns, _):
+    # Frames are concatenated oldest cycle first, so the first visit is kept
+    return frame.duplicated(subset=list(columns), keep='first').to_numpy()
+
+
+CHECKS = {
+    'range': _range,
+    'isin': _isin,
+    'all_zero': _all_zero,
+    'none_taken': _none_taken,
+    'not_below': _not_below,
+    'height_for_age': _height_for_age,
+    'duplicate': _duplicate,
+}
+
+
+# Checks that work on whichever of their columns the frame has
+COLUMNWISE = ('range', 'isin', 'all_zero', 'none_taken')
+
+
+def _applicable(frame, rules):
+    for rule in rules:
+        present = tuple(col for col in rule.columns if col in frame)
+        if present == rule.columns or (present and rule.check in COLUMNWISE):
+            yield rule._replace(columns=present)
+
+
+def failures(frame, rules=RULES):
+    """Boolean matrix (rows x applicable rules) of rule failures, and those rules."""
+    applied = list(_applicable(frame, rules))
+    matrix = np.zeros((len(frame), len(applied)), dtype=bool)
+    for i, rule in enumerate(applied):
+        matrix[:, i] = CHECKS[rule.check](frame, rule.columns, rule.limits)
+    return matrix, applied
+
+
+def report(matrix, rules):
+    """Rows rejected by each rule ('Only' counts rows no other rule rejected), plus a total."""
+    only = matrix & (matrix.sum(axis=1) == 1)[:, None]
+    rejected = matrix.any(axis=1)
+    return pd.DataFrame({
+        'Rule': [rule.name for rule in rules] + ['any'],
+        'Description': [rule.description for rule in rules] + ['rows failing at least one rule'],
+        'Rejected': np.append(matrix.sum(axis=0), rejected.sum()),
+        'Only': np.append(only.sum(axis=0), rejected.sum()),
+    })
+
+
+def validate(frame, rules=RULES):
+    """Return (boolean quality mask, per-rule rejection report) for a frame."""
+    matrix, applied = failures(frame, rules)
+    return ~matrix.any(axis=1), report(matrix, applied)
+
+
+def apply(frame, rules=RULES):
+    """The frame with a QUALITY_OK column, and the rejection report."""
+    mask, rejections = validate(frame, rules)
+    return frame.assign(**{QUALITY_COLUMN: mask}), rejections
@@ -0,0 +1,55 @@
+"""Averaging of repeat blood pressure readings.
+
+NHANES records up to three auscultatory (BPXSY1-3 / BPXDI1-3) and, from
+2017, three oscillometric (BPXOSY1-3 / BPXODI1-3) readings per visit.
+Following the guideline of averaging repeat measurements, each visit's BP is
+the mean of its available auscultatory readings, or of its oscillometric
+readings when it has no auscultatory ones. Missing columns count as missing
+readings, so frames with only BPXSY1/BPXDI1 average to those values. A
+diastolic reading of 0 (sounds heard down to zero, common in young children)
+is not a measurement and also counts as missing.
+"""
+
+import numpy as np
+
+AUSCULTATORY_SBP = ['BPXSY1', 'BPXSY2', 'BPXSY3']
+AUSCULTATORY_DBP = ['BPXDI1', 'BPXDI2', 'BPXDI3']
+OSCILLOMETRIC_SBP = ['BPXOSY1', 'BPXOSY2', 'BPXOSY3']
+OSCILLOMETRIC_DBP = ['BPXODI1', 'BPXODI2', 'BPXODI3']
+READING_COLUMNS = AUSCULTATORY_SBP + AUSCULTATORY_DBP + OSCILLOMETRIC_SBP + OSCILLOMETRIC_DBP
+
+AVERAGE_COLUMNS = ['SBP_AVG', 'DBP_AVG']
+
+
+def _stack(frame, columns, zero_missing=False):
+    present = [col for col in columns if col in frame]
+    if not present:
+        return np.full((len(frame), 1), np.nan)
+    values = np.column_stack([frame[col].to_numpy(dtype=float) for col in present])
+    if zero_missing:
+        values[values == 0] = np.nan
+    return values
+
+
+def _mean(values):
+    counts = (~np.isnan(values)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.nansum(values, axis=1) / counts, np.nan), counts
+
+
+def average(frame, auscultatory, oscillometric, zero_missing=False):
+    """Per-row mean of the auscultatory columns, falling back to the oscillometric ones.
+
+    With zero_missing, readings of 0 are treated as missing before averaging.
+    """
+    ausc, ausc_counts = _mean(_stack(frame, auscultatory, zero_missing))
+    osc, _ = _mean(_stack(frame, oscillometric, zero_missing))
+    return np.where(ausc_counts > 0, ausc, osc)
+
+
+def average_readings(frame):
+    """Return {'SBP_AVG': ..., 'DBP_AVG': ...} arrays for a frame of readings."""
+    return {
+        'SBP_AVG': average(frame, AUSCULTATORY_SBP, OSCILLOMETRIC_SBP),
+        'DBP_AVG': average(frame, AUSCULTATORY_DBP, OSCILLOMETRIC_DBP, zero_missing=True),
+    }
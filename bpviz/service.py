@@ -0,0 +1,201 @@
+"""ASGI service exposing the percentile engine over HTTP.
+
+    uvicorn bpviz.service:app        (or: python -m bpviz serve)
+
+POST /percentile        {"sex": "M", "age": 10.5, "height": 140, "sbp": 112, "dbp": 70}
+POST /percentile/bulk   {"records": [{...}, {...}]}
+GET  /health
+GET  /metrics           stage timings and counters (Prometheus text; BPVIZ_METRICS=1)
+
+Concurrent requests are coalesced into micro-batches: the first request
+waits at most MAX_DELAY seconds for others to arrive, then the whole batch
+is scored in one vectorized call against the tables loaded at startup.
+"""
+
+import asyncio
+import json
+import math
+
+import numpy as np
+
+from bpviz import metrics, tables
+from bpviz.percentiles import MODES, score
+
+MAX_BATCH = 4096
+MAX_DELAY = 0.001
+FIELDS = ('sex', 'age', 'height', 'sbp', 'dbp')
+REQUIRED_FIELDS = ('sex', 'age', 'height')
+SEX_CODES = {1: 'M', 2: 'F'}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def parse_records(records):
+    """Turn a list of record dicts into column arrays for score()."""
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise BadRequest('expected a list of JSON objects')
+    columns = {}
+    try:
+        # NHANES RIAGENDR codes (1 = male, 2 = female) are accepted as well as 'M'/'F'
+        columns['sex'] = np.array([SEX_CODES.get(r['sex'], r['sex']) for r in records], dtype=object)
+        for field in REQUIRED_FIELDS[1:]:
+            columns[field] = np.array([float(r[field]) for r in records])
+        for field in ('sbp', 'dbp'):
+            columns[field] = np.array([np.nan if r.get(field) is None else float(r[field]) for r in records])
+    except KeyError as e:
+        raise BadRequest('missing field %s' % e) from None
+    except (TypeError, ValueError) as e:
+        raise BadRequest(str(e)) from None
+    return columns
+
+
+def _number(value):
+    return None if math.isnan(value) else value
+
+
+def format_results(scores, start, stop):
+    """JSON-ready result dicts for rows start:stop of a scored batch (null where unscored)."""
+    rows = zip(scores['SBP Percentile'][start:stop].tolist(), scores['SBP Status'][start:stop],
+               scores['DBP Percentile'][start:stop].tolist(), scores['DBP Status'][start:stop])
+    return [{'sbp_percentile': _number(sbp), 'sbp_status': sbp_status or None,
+             'dbp_percentile': _number(dbp), 'dbp_status': dbp_status or None}
+            for sbp, sbp_status, dbp, dbp_status in rows]
+
+
+class MicroBatcher:
+    """Collects concurrent scoring requests and evaluates them together."""
+
+    def __init__(self, mode='nearest', max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        self.mode = mode
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, columns):
+        """Score one request's columns; returns a list of result dicts."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((columns, future))
+        return await future
+
+    def _drain(self, batch, rows):
+        while rows < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            rows += len(item[0]['age'])
+        return rows
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            rows = self._drain(batch, len(batch[0][0]['age']))
+            if rows < self.max_batch and self.max_delay:
+                await asyncio.sleep(self.max_delay)
+                rows = self._drain(batch, rows)
+            self._score(batch)
+
+    def _score(self, batch):
+        self.batches += 1
+        metrics.count('service_batches')
+        with metrics.profiled('service_batch'), metrics.timer('service_batch'):
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        try:
+            merged = {field: np.concatenate([columns[field] for columns, _ in batch]) for field in FIELDS}
+            scores = score(merged['sex'], merged['age'], merged['height'], merged['sbp'], merged['dbp'], mode=self.mode)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        start = 0
+        for columns, future in batch:
+            stop = start + len(columns['age'])
+            if not future.done():
+                future.set_result(format_results(scores, start, stop))
+            start = stop
+
+
+class App:
+    """Minimal ASGI application; no web framework needed."""
+
+    def __init__(self, mode='nearest', max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        if mode not in MODES:
+            raise ValueError('mode must be one of %s' % ', '.join(MODES))
+        self.batcher = MicroBatcher(mode, max_batch, max_delay)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                tables.load()  # tables stay in memory for the life of the worker
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        path, method = scope['path'].rstrip('/') or '/', scope['method']
+        if path == '/health':
+            status, payload = 200, {'status': 'ok'}
+        elif path == '/metrics':
+            await _send(send, 200, metrics.render().encode(), b'text/plain; version=0.0.4')
+            return
+        elif path in ('/percentile', '/percentile/bulk'):
+            if method != 'POST':
+                status, payload = 405, {'error': 'use POST'}
+            else:
+                status, payload = await self._percentile(path, await _read_body(receive))
+        else:
+            status, payload = 404, {'error': 'not found'}
+        metrics.count('http_requests', path=path if status != 404 else 'other', status=status)
+        await _send_json(send, status, payload)
+
+    async def _percentile(self, path, body):
+        try:
+            request = json.loads(body or b'null')
+            if path == '/percentile':
+                results = await self.batcher.submit(parse_records([request]))
+                return 200, results[0]
+            records = request.get('records') if isinstance(request, dict) else request
+            return 200, {'results': await self.batcher.submit(parse_records(records))}
+        except (ValueError, BadRequest) as e:
+            return 400, {'error': str(e)}
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send(send, status, body, content_type):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_json(send, status, payload):
+    await _send(send, status, json.dumps(payload).encode(), b'application/json')
+
+
+app = App()
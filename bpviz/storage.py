@@ -0,0 +1,130 @@
+"""Compact typed storage for the cleaned NHANES data.
+
+nhanes_clean.csv keeps every value as float64 text. This module writes the
+same frame as an uncompressed Arrow IPC (Feather v2) file with narrow
+dtypes, which can be memory-mapped instead of parsed:
+
+    SEQN                uint32
+    RIAGENDR            uint8    (1 = male, 2 = female)
+    RIDAGEMN            int16    (months, nullable)
+    QUALITY_OK          bool
+    RIDAGEYR, BMX*, BP  float32
+
+The file's schema metadata records the size and SHA-1 of the CSV it was
+built from, so readers can tell whether it still matches that CSV.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+ARROW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nhanes', 'nhanes_clean.arrow')
+
+INTEGER_TYPES = {
+    'SEQN': 'uint32',
+    'RIAGENDR': 'uint8',
+    'RIDAGEMN': 'int16',
+}
+BOOLEAN_COLUMNS = ('QUALITY_OK',)
+SOURCE_KEY = b'source_csv'
+_fingerprints = {}
+
+NULLABLE_TYPES = {
+    'uint32': pd.UInt32Dtype(),
+    'uint8': pd.UInt8Dtype(),
+    'int16': pd.Int16Dtype(),
+}
+
+
+def _arrow_type(pa, name):
+    if name in BOOLEAN_COLUMNS:
+        return pa.bool_()
+    return getattr(pa, INTEGER_TYPES.get(name, 'float32'))()
+
+
+def to_table(frame):
+    """Arrow table of the frame with compact column types."""
+    import pyarrow as pa
+
+    arrays = []
+    for name in frame.columns:
+        values = frame[name].to_numpy(dtype=float)
+        missing = np.isnan(values)
+        if name in INTEGER_TYPES:
+            values = np.where(missing, 0, values)
+        arrays.append(pa.array(values, mask=missing if missing.any() else None).cast(_arrow_type(pa, name)))
+    return pa.Table.from_arrays(arrays, names=list(frame.columns))
+
+
+def fingerprint(csv_path):
+    """'<size>:<sha1>' of a file, hashed once per (mtime, size) of that file."""
+    stat = os.stat(csv_path)
+    key = (os.path.abspath(csv_path), stat.st_mtime_ns, stat.st_size)
+    if key not in _fingerprints:
+        digest = hashlib.sha1()
+        with open(csv_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _fingerprints[key] = '%d:%s' % (stat.st_size, digest.hexdigest())
+    return _fingerprints[key]
+
+
+def write(frame, path=ARROW_PATH, source=None):
+    """Write the frame as an uncompressed, memory-mappable Arrow file.
+
+    source is the CSV the frame was read from; its fingerprint goes into the
+    schema metadata for built_from().
+    """
+    from pyarrow import feather
+
+    table = to_table(frame)
+    if source is not None:
+        table = table.replace_schema_metadata({SOURCE_KEY: fingerprint(source).encode()})
+    tmp_path = path + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def built_from(path, csv_path):
+    """True if the Arrow file at path was written from the current contents of csv_path."""
+    import pyarrow as pa
+
+    if not (os.path.exists(path) and os.path.exists(csv_path)):
+        return False
+    with pa.memory_map(path, 'r') as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    recorded = metadata.get(SOURCE_KEY)
+    if recorded is None:
+        return False
+    size = os.path.getsize(csv_path)
+    # Cheap size check first, so a changed CSV is usually caught without hashing it
+    return recorded.split(b':')[0] == str(size).encode() and recorded.decode() == fingerprint(csv_path)
+
+
+def read_table(path=ARROW_PATH):
+    """Memory-map the Arrow file; columns stay backed by the map until converted."""
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def read(path=ARROW_PATH):
+    """The Arrow file as a DataFrame (integer columns with gaps become nullable Int16 etc.)."""
+    import pyarrow as pa
+
+    types = {_arrow_type(pa, name): NULLABLE_TYPES[dtype] for name, dtype in INTEGER_TYPES.items()}
+    table = read_table(path)
+    frame = table.to_pandas(types_mapper=types.get, split_blocks=True)
+    # Only keep nullable dtypes where there really are gaps
+    for name in INTEGER_TYPES:
+        if name in frame and not frame[name].isna().any():
+            frame[name] = frame[name].to_numpy(dtype=INTEGER_TYPES[name])
+    return frame
+
+
+def convert(csv_path, path=ARROW_PATH):
+    """Convert a cleaned NHANES CSV into the compact format."""
+    write(pd.read_csv(csv_path), path, source=csv_path)
@@ -0,0 +1,124 @@
+"""Dense, precompiled form of the bp-tables CSVs.
+
+The four long-format tables are compiled once into a single array indexed
+[sex, measure, age, height column, row kind] and saved next to the CSVs as
+a .npy file, so workers can memory-map it instead of parsing CSV.
+"""
+
+import os
+
+import numpy as np
+
+TABLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bp-tables')
+CACHE_NAME = 'bp_tables.npy'
+
+SEXES = ('M', 'F')
+MEASURES = ('Systolic BP', 'Diastolic BP')
+HEIGHT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+ROW_KINDS = ('Height (in)', 'Height (cm)', '50th', '90th', '95th', '95th + 12 mm_Hg')
+MIN_AGE = 1
+HEIGHT_DECIMALS = 3
+
+# Row kind indices
+HEIGHT_IN, HEIGHT_CM, P50, P90, P95, P95_PLUS_12 = range(len(ROW_KINDS))
+
+_FILES = {
+    (0, 0): 'MaleSBP.csv',
+    (0, 1): 'MaleDBP.csv',
+    (1, 0): 'FemaleSBP.csv',
+    (1, 1): 'FemaleDBP.csv',
+}
+
+# Heights are shifted by row so every row can be searched in one sorted array
+_ROW_STRIDE = 1000.0
+
+_loaded = {}
+
+
+def compile_tables(table_dir=TABLE_DIR):
+    """Parse the four CSVs into a float64 array of shape (2, 2, ages, 7, 6)."""
+    import pandas as pd
+
+    blocks = {}
+    for (s, m), name in _FILES.items():
+        table = pd.read_csv(os.path.join(table_dir, name))
+        ages = table['Age (y)'].to_numpy()
+        n_ages = len(ages) // len(ROW_KINDS)
+        expected = np.repeat(np.arange(MIN_AGE, MIN_AGE + n_ages), len(ROW_KINDS))
+        if len(ages) != n_ages * len(ROW_KINDS) or not np.array_equal(ages, expected):
+            raise ValueError('%s must list %d rows per age starting at age %d' % (name, len(ROW_KINDS), MIN_AGE))
+        values = table.iloc[:, 2:].to_numpy(dtype=float)
+        blocks[s, m] = values.reshape(n_ages, len(ROW_KINDS), len(HEIGHT_PERCENTILES)).transpose(0, 2, 1)
+    shapes = {block.shape for block in blocks.values()}
+    if len(shapes) != 1:
+        raise ValueError('bp-tables do not all cover the same ages')
+    tensor = np.empty((len(SEXES), len(MEASURES)) + shapes.pop())
+    for (s, m), block in blocks.items():
+        tensor[s, m] = block
+    if not (np.diff(tensor[..., HEIGHT_CM], axis=-1) > 0).all():
+        raise ValueError('Height (cm) rows must increase across the percentile columns')
+    return tensor
+
+
+def is_stale(cache_path, table_dir):
+    """True if a file derived from the tables is missing or older than any table CSV."""
+    if not os.path.exists(cache_path):
+        return True
+    cache_mtime = os.path.getmtime(cache_path)
+    return any(os.path.getmtime(os.path.join(table_dir, name)) > cache_mtime for name in _FILES.values())
+
+
+def load(table_dir=TABLE_DIR, use_cache=True):
+    """Return the compiled table array, memory-mapping the .npy cache when it is fresh."""
+    if table_dir in _loaded:
+        return _loaded[table_dir]
+    cache_path = os.path.join(table_dir, CACHE_NAME)
+    if use_cache and not is_stale(cache_path, table_dir):
+        tensor = np.load(cache_path, mmap_mode='r')
+    else:
+        tensor = compile_tables(table_dir)
+        if use_cache:
+            try:
+                np.save(cache_path, tensor)
+            except OSError:
+                pass  # read-only deployments just keep the in-memory copy
+    _loaded[table_dir] = tensor
+    return tensor
+
+
+def ages(tensor):
+    """Ages (years) covered by the tensor."""
+    return np.arange(MIN_AGE, MIN_AGE + tensor.shape[2])
+
+
+def _search_keys(tensor):
+    heights = np.asarray(tensor[..., HEIGHT_CM])
+    rows = np.arange(heights[..., 0].size).reshape(heights.shape[:-1])
+    return heights, (rows[..., None] * _ROW_STRIDE + heights).ravel()
+
+
+def height_bracket(tensor, sex, measure, age_idx, height):
+    """Index of the tabulated height just above each height, clipped to [1, columns - 1].
+
+    All rows are searched together with one binary search over the sorted,
+    row-offset height breakpoints.
+    """
+    heights, keys = _search_keys(tensor)
+    n_cols = heights.shape[-1]
+    row = np.ravel_multi_index((sex, measure, age_idx), heights.shape[:-1])
+    right = np.searchsorted(keys, row * _ROW_STRIDE + np.clip(height, 0, _ROW_STRIDE - 1)) - row * n_cols
+    return np.clip(right, 1, n_cols - 1)
+
+
+def height_column(tensor, sex, measure, age_idx, height):
+    """Index of the tabulated height closest to each height (first column on ties).
+
+    Heights are rounded to HEIGHT_DECIMALS first so float32 storage noise
+    (168.1 -> 168.100006) cannot move a height across a column midpoint.
+    """
+    height = np.round(height, HEIGHT_DECIMALS)
+    right = height_bracket(tensor, sex, measure, age_idx, height)
+    heights = np.asarray(tensor[..., HEIGHT_CM])
+    lower = heights[sex, measure, age_idx, right - 1]
+    upper = heights[sex, measure, age_idx, right]
+    return np.where(np.abs(height - lower) <= np.abs(upper - height), right - 1, right)
@@ -0,0 +1,161 @@
+"""Append-only store of repeat visits, indexed by patient and sorted by age.
+
+Each append is written as a new segment file (visits-NNNNNN.npz) and never
+modified; compact() folds the segments into one. In memory the visits are
+kept in one array sorted by (SEQN, age), so a patient's history is two
+binary searches, plus a small unsorted buffer of recent appends that is
+merged in once it grows past BUFFER_LIMIT rows.
+"""
+
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bpviz.percentiles import STATUS_LABELS, score, sex_index
+
+VISITS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'visits')
+BUFFER_LIMIT = 50000
+
+COLUMNS = {
+    'SEQN': np.int64,
+    'SEX': np.int8,     # 0 = male, 1 = female
+    'AGE': np.float64,  # years
+    'HEIGHT': np.float32,
+    'SBP': np.float32,
+    'DBP': np.float32,
+}
+
+# Recheck windows from the recommended actions table, in years
+SIX_MONTHS = 0.5
+TWELVE_MONTHS = 1.0
+
+
+def _empty():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _concat(parts):
+    return {name: np.concatenate([part[name] for part in parts]).astype(dtype, copy=False)
+            for name, dtype in COLUMNS.items()}
+
+
+def _sorted(columns):
+    order = np.lexsort((columns['AGE'], columns['SEQN']))
+    return {name: values[order] for name, values in columns.items()}
+
+
+class VisitStore:
+
+    def __init__(self, directory=VISITS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        segments = sorted(glob.glob(os.path.join(directory, 'visits-*.npz'))) if directory else []
+        parts = [dict(np.load(path)) for path in segments]
+        self._main = _sorted(_concat(parts)) if parts else _empty()
+        self._buffer = []
+        self._next_segment = len(segments) and int(os.path.basename(segments[-1])[7:13]) + 1
+
+    def __len__(self):
+        return len(self._main['SEQN']) + sum(len(part['SEQN']) for part in self._buffer)
+
+    def append(self, seqn, sex, age, height, sbp, dbp):
+        """Add visits (arrays or scalars); sex as 'M'/'F' or NHANES 1/2."""
+        seqn, sex, age, height, sbp, dbp = np.broadcast_arrays(
+            np.asarray(seqn), sex_index(sex), np.asarray(age, dtype=float),
+            np.asarray(height, dtype=float), np.asarray(sbp, dtype=float), np.asarray(dbp, dtype=float))
+        if (sex < 0).any():
+            raise ValueError('sex must be M/F or 1/2')
+        part = {name: np.asarray(values, dtype=COLUMNS[name]).ravel() for name, values in
+                zip(COLUMNS, (seqn, sex, age, height, sbp, dbp))}
+        with self._lock:
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, 'visits-%06d.npz' % self._next_segment)
+                np.savez(path, **part)
+                self._next_segment += 1
+            self._buffer.append(part)
+            if sum(len(p['SEQN']) for p in self._buffer) > BUFFER_LIMIT:
+                self._merge_buffer()
+
+    def _merge_buffer(self):
+        if self._buffer:
+            self._main = _sorted(_concat([self._main] + self._buffer))
+            self._buffer = []
+
+    def compact(self):
+        """Rewrite all segments as a single sorted one."""
+        with self._lock:
+            self._merge_buffer()
+            if not self.directory:
+                return
+            old = glob.glob(os.path.join(self.directory, 'visits-*.npz'))
+            path = os.path.join(self.directory, 'visits-%06d.npz' % self._next_segment)
+            np.savez(path, **self._main)
+            self._next_segment += 1
+            for stale in old:
+                os.remove(stale)
+
+    def _rows(self, seqn, age_min, age_max):
+        main = self._main
+        lo, hi = np.searchsorted(main['SEQN'], [seqn, seqn + 1])
+        ages = main['AGE'][lo:hi]
+        start, stop = lo + np.searchsorted(ages, age_min, 'left'), lo + np.searchsorted(ages, age_max, 'right')
+        parts = [{name: values[start:stop] for name, values in main.items()}]
+        for part in self._buffer:
+            mask = (part['SEQN'] == seqn) & (part['AGE'] >= age_min) & (part['AGE'] <= age_max)
+            if mask.any():
+                parts.append({name: values[mask] for name, values in part.items()})
+        return _sorted(_concat(parts)) if len(parts) > 1 else parts[0]
+
+    def history(self, seqn, age_min=-np.inf, age_max=np.inf):
+        """A patient's visits between two ages, oldest first, scored and flagged."""
+        rows = self._rows(int(seqn), age_min, age_max)
+        visits = pd.DataFrame({
+            'SEQN': rows['SEQN'],
+            'Sex': np.where(rows['SEX'] == 0, 'M', 'F'),
+            'Age': rows['AGE'],
+            'Height': rows['HEIGHT'],
+            'SBP': rows['SBP'],
+            'DBP': rows['DBP'],
+        })
+        scores = score(visits['Sex'], visits['Age'], visits['Height'], visits['SBP'], visits['DBP'])
+        for name, values in scores.items():
+            visits[name] = values
+        visits['Flag'] = follow_up_flags(visits['Age'].to_numpy(), worst_status(scores['SBP Status'], scores['DBP Status']))
+        return visits
+
+
+def worst_status(*statuses):
+    """Per visit, the most severe of several status label arrays ('' if none scored)."""
+    rank = {label: i for i, label in enumerate(STATUS_LABELS)}
+    codes = np.max([[rank.get(label, -1) for label in labels] for labels in statuses], axis=0)
+    return np.array([STATUS_LABELS[code] if code >= 0 else '' for code in codes], dtype=object)
+
+
+def follow_up_flags(ages, statuses):
+    """Flag visits that hit a follow-up rule in the recommended actions table.
+
+    ages must be sorted; statuses are the per-visit labels. A run is a streak
+    of consecutive visits at or above the 90th percentile.
+    """
+    flags = np.full(len(ages), '', dtype=object)
+    run_start, hypertension_visits = None, 0
+    for i, (age, label) in enumerate(zip(ages, statuses)):
+        if label not in ('Elevated BP', 'Hypertension'):
+            run_start, hypertension_visits = None, 0
+            continue
+        if run_start is None:
+            run_start = age
+        hypertension_visits = hypertension_visits + 1 if label == 'Hypertension' else 0
+        if hypertension_visits >= 3:
+            flags[i] = 'Hypertension at 3 visits: ABPM, diagnostic evaluation and treatment'
+        elif hypertension_visits == 2:
+            flags[i] = 'Hypertension confirmed at recheck: check upper and lower extremity BP'
+        elif age - run_start >= TWELVE_MONTHS:
+            flags[i] = 'Still elevated after 12 months: ABPM and diagnostic evaluation'
+        elif age - run_start >= SIX_MONTHS:
+            flags[i] = 'Still elevated at 6 months: check upper and lower extremity BP'
+    return flags
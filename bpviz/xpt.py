@@ -0,0 +1,180 @@
+"""Streaming reader for SAS XPORT (version 5) transport files.
+
+The 80-byte header records are parsed once, then observations are streamed
+in fixed-size batches straight from a memory map. Only the requested
+variables are decoded; IBM floats are converted to float64 with NumPy.
+"""
+
+import mmap
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+RECORD = 80
+BATCH_SIZE = 65536
+
+_LIBRARY = b'HEADER RECORD*******LIBRARY HEADER RECORD!!!!!!!'
+_MEMBER = b'HEADER RECORD*******MEMBER  HEADER RECORD!!!!!!!'
+_NAMESTR = b'HEADER RECORD*******NAMESTR HEADER RECORD!!!!!!!'
+_OBS = b'HEADER RECORD*******OBS     HEADER RECORD!!!!!!!'
+
+# ntype, nhfun, nlng, nvar0, nname, nlabel, nform, nfl, nfd, nfj, nfill, niform, nifl, nifd, npos
+_NAMESTR_FORMAT = struct.Struct('>hhhh8s40s8shhh2s8shhl')
+
+# First byte of a SAS missing value: '.', '_' or 'A'-'Z'
+_MISSING_BYTES = np.zeros(256, dtype=bool)
+_MISSING_BYTES[[0x2e, 0x5f] + list(range(0x41, 0x5b))] = True
+
+Variable = namedtuple('Variable', ['name', 'label', 'numeric', 'length', 'position'])
+
+
+def _decode_text(raw):
+    return raw.decode('latin-1').rstrip(' \x00')
+
+
+def ibm_to_float(raw):
+    """Convert an (n, 8) uint8 array of big-endian IBM doubles to float64, NaN for SAS missing."""
+    bits = raw.copy().view('>u8')[:, 0]
+    first = raw[:, 0]
+    fraction = (bits & np.uint64(0x00FFFFFFFFFFFFFF)).astype(np.float64)
+    exponent = (first & 0x7F).astype(np.int64)
+    values = np.ldexp(fraction, 4 * (exponent - 64) - 56)
+    values = np.where(first & 0x80, -values, values)
+    missing = _MISSING_BYTES[first] & ~(bits & np.uint64(0x00FFFFFFFFFFFFFF)).astype(bool)
+    values[missing] = np.nan
+    return values
+
+
+class XPTReader:
+    """Iterate over an XPT file as dicts of NumPy arrays, one batch of rows at a time.
+
+        with XPTReader('nhanes/DEMO_J.XPT', ['SEQN', 'RIAGENDR']) as reader:
+            for batch in reader:
+                ...
+    """
+
+    def __init__(self, path, columns=None, batch_size=BATCH_SIZE, use_mmap=True):
+        self.path = path
+        self.batch_size = batch_size
+        self._file = open(path, 'rb')
+        try:
+            if use_mmap:
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buffer = self._file.read()
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+        if columns is None:
+            self.columns = [var.name for var in self.variables]
+        else:
+            self.columns = [col for col in columns if col in self._by_name]
+        self._dtype = np.dtype({
+            'names': self.columns,
+            'formats': ['V%d' % self._by_name[col].length for col in self.columns],
+            'offsets': [self._by_name[col].position for col in self.columns],
+            'itemsize': self.record_length,
+        })
+
+    def _record(self, index):
+        return bytes(self._buffer[index * RECORD:(index + 1) * RECORD])
+
+    def _parse_header(self):
+        if not self._record(0).startswith(_LIBRARY):
+            raise ValueError('%s is not a SAS XPORT version 5 file' % self.path)
+        member = self._record(3)
+        if not member.startswith(_MEMBER):
+            raise ValueError('%s has no member header' % self.path)
+        namestr_length = int(member[74:78])
+        self.name = _decode_text(self._record(5)[8:16])
+
+        namestr = self._record(7)
+        if not namestr.startswith(_NAMESTR):
+            raise ValueError('%s has no NAMESTR header' % self.path)
+        n_vars = int(namestr[54:58])
+
+        start = 8 * RECORD
+        self.variables = []
+        for i in range(n_vars):
+            offset = start + i * namestr_length
+            fields = _NAMESTR_FORMAT.unpack_from(self._buffer, offset)
+            self.variables.append(Variable(
+                name=_decode_text(fields[4]),
+                label=_decode_text(fields[5]),
+                numeric=fields[0] == 1,
+                length=fields[2],
+                position=fields[14],
+            ))
+        self._by_name = {var.name: var for var in self.variables}
+
+        obs_offset = start + -(-n_vars * namestr_length // RECORD) * RECORD
+        if not bytes(self._buffer[obs_offset:obs_offset + len(_OBS)]) == _OBS:
+            raise ValueError('%s has no OBS header' % self.path)
+        self.data_offset = obs_offset + RECORD
+        self.record_length = sum(var.length for var in self.variables)
+        self.nobs = self._count_records()
+
+    def _count_records(self):
+        data_length = len(self._buffer) - self.data_offset
+        if self.record_length >= RECORD:
+            return data_length // self.record_length
+        # Short records: the last 80-byte card may be padded with blanks
+        last_card = np.frombuffer(self._buffer, dtype=np.uint8, count=RECORD, offset=len(self._buffer) - RECORD)
+        blank_words = (last_card.reshape(-1, 8) == 0x20).all(axis=1).sum()
+        return (data_length - 8 * blank_words) // self.record_length
+
+    def _decode(self, records):
+        batch = {}
+        for col in self.columns:
+            var = self._by_name[col]
+            raw = np.ascontiguousarray(records[col]).view(np.uint8).reshape(-1, var.length)
+            if var.numeric:
+                if var.length < 8:
+                    raw = np.pad(raw, ((0, 0), (0, 8 - var.length)))
+                batch[col] = ibm_to_float(raw)
+            else:
+                batch[col] = np.array([_decode_text(row.tobytes()) for row in raw], dtype=object)
+        return batch
+
+    def __iter__(self):
+        for start in range(0, self.nobs, self.batch_size):
+            count = min(self.batch_size, self.nobs - start)
+            records = np.frombuffer(self._buffer, dtype=self._dtype, count=count,
+                                    offset=self.data_offset + start * self.record_length)
+            batch = self._decode(records)
+            del records
+            yield batch
+
+    def close(self):
+        if isinstance(getattr(self, '_buffer', None), mmap.mmap):
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass  # a caller still holds a view; the map is released with it
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_batches(path, columns=None, batch_size=BATCH_SIZE):
+    """Yield dicts of column arrays from an XPT file."""
+    with XPTReader(path, columns, batch_size) as reader:
+        yield from reader
+
+
+def read(path, columns=None):
+    """Read the requested columns of an XPT file into a DataFrame."""
+    import pandas as pd
+
+    with XPTReader(path, columns) as reader:
+        batches = list(reader)
+        columns = reader.columns
+    if not batches:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame({col: np.concatenate([batch[col] for batch in batches]) for col in columns})
@@ -0,0 +1,62 @@
+import altair as alt
+import streamlit as st
+
+from bpviz import cohort
+from bpviz import data as bpdata
+
+# Streamlit app setup
+st.title('NHANES Pediatric Cohort Blood Pressure Summary (0-13 years old)')
+
+# Load the summary table precomputed at ingest time (counts only, no patient rows)
+summary = bpdata.cohort_summary()
+if summary is None:
+    st.info('No cohort summary yet: run the NHANES ingest (nhanes.ipynb) to build it.')
+    st.stop()
+
+# Filters
+measure = st.radio('Blood pressure:', ('Systolic BP', 'Diastolic BP'), horizontal=True)
+sexes = st.multiselect('Sex:', ['M', 'F'], default=['M', 'F'])
+cycles = st.multiselect('NHANES cycles:', sorted(summary['CYCLE'].unique()), default=sorted(summary['CYCLE'].unique()))
+selected = summary[(summary['Measure'] == measure) & summary['Sex'].isin(sexes) & summary['CYCLE'].isin(cycles)]
+
+st.caption(f"{selected['Count'].sum()} {measure.lower()} readings")
+
+status_colors = alt.Scale(
+    domain=['Normal BP', 'Elevated BP', 'Hypertension'],
+    range=['darkgreen', 'darkgoldenrod', 'red']
+)
+
+# Prevalence of each status by age
+st.subheader('Blood pressure status by age')
+by_age = cohort.prevalence(selected, by=['Age'])
+prevalence_chart = alt.Chart(by_age).mark_bar().encode(
+    x=alt.X('Age:O', title='Age (years)'),
+    y=alt.Y('Share:Q', title='Share of readings', axis=alt.Axis(format='%')),
+    color=alt.Color('Status:N', scale=status_colors, legend=alt.Legend(title='Status')),
+    tooltip=['Age:O', 'Status:N', 'Count:Q', alt.Tooltip('Share:Q', format='.1%')]
+).properties(height=300)
+st.altair_chart(prevalence_chart, use_container_width=True)
+
+# Prevalence of elevated BP or hypertension by cycle and sex
+st.subheader('Elevated BP or hypertension by cycle')
+by_cycle = cohort.prevalence(selected, by=['CYCLE', 'Sex'])
+by_cycle = by_cycle[by_cycle['Status'] != 'Normal BP'].groupby(['CYCLE', 'Sex'], as_index=False)[['Count', 'Share']].sum()
+cycle_chart = alt.Chart(by_cycle).mark_line(point=True).encode(
+    x=alt.X('CYCLE:O', title='NHANES cycle'),
+    y=alt.Y('Share:Q', title='Share of readings', axis=alt.Axis(format='%')),
+    color=alt.Color('Sex:N', legend=alt.Legend(title='Sex')),
+    tooltip=['CYCLE:O', 'Sex:N', 'Count:Q', alt.Tooltip('Share:Q', format='.1%')]
+).properties(height=300)
+st.altair_chart(cycle_chart, use_container_width=True)
+
+# Distribution of percentiles (already binned at ingest)
+st.subheader('Distribution of blood pressure percentiles')
+bins = cohort.histogram(selected)
+bins['Bin End'] = bins['Bin'] + cohort.BIN_WIDTH
+histogram_chart = alt.Chart(bins).mark_bar().encode(
+    x=alt.X('Bin:Q', title='Blood Pressure Percentile', bin='binned', scale=alt.Scale(domain=(0, 100))),
+    x2='Bin End:Q',
+    y=alt.Y('Count:Q', title='Readings'),
+    tooltip=['Bin:Q', 'Count:Q']
+).properties(height=300)
+st.altair_chart(histogram_chart, use_container_width=True)
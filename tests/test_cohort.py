@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from bpviz import cohort
+
+
+def cycle(seed, rows=50):
+    rng = np.random.default_rng(seed)
+    age = rng.uniform(1, 13, rows)
+    return pd.DataFrame({
+        'RIAGENDR': rng.choice([1, 2], rows),
+        'RIDAGEYR': age,
+        'BMXHT': 75 + 6 * age,
+        'SBP_AVG': rng.normal(100, 10, rows).round(),
+        'DBP_AVG': rng.normal(60, 10, rows).round(),
+    })
+
+
+def test_refresh_recomputes_only_changed_cycles(tmp_path):
+    path = str(tmp_path / 'summary.csv')
+    frames = {'2001-2002': cycle(0), '2003-2004': cycle(1)}
+    assert cohort.refresh_file(frames, path) == ['2001-2002', '2003-2004']
+    assert cohort.refresh_file(frames, path) == []
+
+    # Rows change without any file being decoded again, e.g. a new averaging rule
+    before = cohort.load(path)
+    frames['2003-2004'] = frames['2003-2004'].assign(SBP_AVG=frames['2003-2004']['SBP_AVG'] + 20)
+    assert cohort.refresh_file(frames, path) == ['2003-2004']
+    after = cohort.load(path)
+    pd.testing.assert_frame_equal(after[after['CYCLE'] == '2001-2002'], before[before['CYCLE'] == '2001-2002'])
+    assert not after[after['CYCLE'] == '2003-2004'].equals(before[before['CYCLE'] == '2003-2004'])
+
+    # Reverting brings the original summary back
+    frames['2003-2004'] = cycle(1)
+    assert cohort.refresh_file(frames, path) == ['2003-2004']
+    pd.testing.assert_frame_equal(cohort.load(path), before)
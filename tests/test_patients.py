@@ -0,0 +1,24 @@
+from bpviz.patients import Page, PatientIndex
+
+SEQNS = [5, 10, 65, 100, 650, 651, 1000, 6500]
+
+
+def test_prefix_spans_every_length():
+    index = PatientIndex(SEQNS)
+    assert index.prefix('65').items == [65, 650, 651, 6500]
+    assert index.prefix('1').items == [10, 100, 1000]
+    assert index.prefix('').total == len(SEQNS)
+
+
+def test_prefix_with_leading_zero_matches_nothing():
+    index = PatientIndex(SEQNS)
+    assert index.prefix('0') == Page([], 0, 1, 1)
+    assert index.prefix('065') == Page([], 0, 1, 1)
+
+
+def test_search_range_and_paging():
+    index = PatientIndex(SEQNS)
+    assert index.search('60-700').items == [65, 100, 650, 651]
+    page = index.search('', page=2, page_size=3)
+    assert page == Page([100, 650, 651], 8, 2, 3)
+    assert index.offset(650) == 4 and index.offset('x') is None
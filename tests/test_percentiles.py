@@ -0,0 +1,68 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from bpviz import tables
+from bpviz.percentiles import percentiles, score, status
+
+ROWS = 300
+
+
+@functools.lru_cache()
+def legacy_table(sex, measure):
+    name = {'M': 'Male', 'F': 'Female'}[sex] + {'Systolic BP': 'SBP', 'Diastolic BP': 'DBP'}[measure] + '.csv'
+    return pd.read_csv(os.path.join(tables.TABLE_DIR, name))
+
+
+# The per-row loop MR_viz.py scored with before the vectorized engine
+def legacy_percentile(sex, measure, age, height, bp):
+    pertable = legacy_table(sex, measure)
+    current_pertable = pertable[pertable['Age (y)'] == round(age)]
+    hts = current_pertable[current_pertable['Data'] == 'Height (cm)'].iloc[:, 2:]
+    ht_col = abs(hts - height).stack().idxmin()[1]
+    bp_50 = current_pertable[current_pertable['Data'] == '50th'][ht_col].item()
+    bp_95 = current_pertable[current_pertable['Data'] == '95th'][ht_col].item()
+    sigma = (bp_95 - bp_50) / 1.645
+    return stats.norm.cdf((bp - bp_50) / sigma) * 100
+
+
+def children(rows=ROWS, seed=0):
+    rng = np.random.default_rng(seed)
+    age = rng.uniform(1, 17, rows)
+    bp = rng.normal(95, 20, rows).round()
+    # Fractional (averaged) readings and readings outside the 0-255 grid
+    bp[::7] += 1 / 3
+    bp[::11] = rng.choice([-10, 256, 300], len(bp[::11]))
+    return pd.DataFrame({
+        'Sex': rng.choice(['M', 'F'], rows),
+        'Type': rng.choice(['Systolic BP', 'Diastolic BP'], rows),
+        'Age': age,
+        'Height': 75 + 6 * age + rng.normal(0, 10, rows),
+        'Blood Pressure Value': bp,
+    })
+
+
+def test_matches_legacy_loop():
+    frame = children()
+    expected = [legacy_percentile(*row) for row in frame[['Sex', 'Type', 'Age', 'Height', 'Blood Pressure Value']].itertuples(index=False)]
+    result = percentiles(frame['Sex'], frame['Type'], frame['Age'], frame['Height'], frame['Blood Pressure Value'])
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-5)
+
+
+def test_unscorable_children_are_nan():
+    # Age 0 is below the tables, a NaN height has no column, 'X' is no sex
+    result = percentiles(['M', 'F', 'X', 'M'], 'Systolic BP', [0, 10, 10, 18], [60, np.nan, 140, 170], 100)
+    assert np.isnan(result).all()
+    assert (status(result) == '').all()
+
+
+def test_score_matches_percentiles():
+    frame = children()
+    scores = score(frame['Sex'], frame['Age'], frame['Height'], frame['Blood Pressure Value'], frame['Blood Pressure Value'])
+    for measure, key in (('Systolic BP', 'SBP'), ('Diastolic BP', 'DBP')):
+        expected = percentiles(frame['Sex'], measure, frame['Age'], frame['Height'], frame['Blood Pressure Value'])
+        np.testing.assert_array_equal(scores[key + ' Percentile'], expected)
+        np.testing.assert_array_equal(scores[key + ' Status'], status(expected))
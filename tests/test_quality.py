@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from bpviz import quality
+
+
+def test_zero_diastolic_is_told_apart_from_a_missing_one():
+    frame = pd.DataFrame({
+        'SEQN': [1, 2, 3, 4, 5],
+        'BPXSY1': [100, 100, np.nan, 100, 100],
+        'BPXDI1': [0, 0, 60, np.nan, 60],
+        'BPXDI2': [np.nan, 60, 60, np.nan, 0],
+    })
+    mask, rejections = quality.validate(frame)
+    counts = rejections.set_index('Rule')
+    # 1: heard to zero; 3: no systolic taken; 4: no diastolic taken; 2 and 5 have a usable diastolic
+    assert mask.tolist() == [False, True, False, False, True]
+    assert counts.loc['dbp_zero', 'Rejected'] == 1 and counts.loc['dbp_zero', 'Only'] == 1
+    assert counts.loc['bp_missing', 'Rejected'] == 2 and counts.loc['bp_missing', 'Only'] == 2
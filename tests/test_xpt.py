@@ -0,0 +1,95 @@
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from bpviz import xpt
+
+NHANES_XPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nhanes', 'DEMO_J.XPT')
+
+
+def ibm(value, length=8):
+    """value as a big-endian IBM double, truncated to length bytes like SAS does."""
+    if value == 0:
+        return bytes(length)
+    sign, value, exponent = (0x80 if value < 0 else 0), abs(value), 64
+    while value >= 1:
+        value, exponent = value / 16, exponent + 1
+    while value < 1 / 16:
+        value, exponent = value * 16, exponent - 1
+    return (bytes([sign | exponent]) + int(value * 2 ** 56).to_bytes(7, 'big'))[:length]
+
+
+def missing(code, length=8):
+    return code.encode() + bytes(length - 1)
+
+
+def header(text, numbers=''):
+    return ('HEADER RECORD*******%-8sHEADER RECORD!!!!!!!' % text).encode() + numbers.encode().ljust(32, b' ')
+
+
+def write_xpt(path, variables, rows):
+    """A minimal XPORT v5 file; variables are (name, numeric, length), rows are lists of raw bytes."""
+    cards = [
+        header('LIBRARY', '0' * 30),
+        b'SAS     SAS     SASLIB  9.4     X64_10PR'.ljust(64) + b'01JAN24:00:00:00',
+        b'01JAN24:00:00:00'.ljust(80),
+        header('MEMBER', '000000000000000001600000000140'),
+        header('DSCRPTR', '0' * 30),
+        b'SAS     TEST    SASDATA 9.4     X64_10PR'.ljust(64) + b'01JAN24:00:00:00',
+        b'01JAN24:00:00:00'.ljust(80),
+        header('NAMESTR', '000000%04d00000000000000000000' % len(variables)),
+    ]
+    namestrs, position = b'', 0
+    for i, (name, numeric, length) in enumerate(variables):
+        namestrs += struct.pack('>hhhh8s40s8shhh2s8shhl', 1 if numeric else 2, 0, length, i + 1, name.encode().ljust(8),
+                                name.encode().ljust(40), bytes(8), 0, 0, 0, bytes(2), bytes(8), 0, 0, position).ljust(140, b'\x00')
+        position += length
+    data = b''.join(b''.join(row) for row in rows)
+    with open(path, 'wb') as f:
+        f.write(b''.join(cards))
+        f.write(namestrs.ljust(-(-len(namestrs) // 80) * 80, b' '))
+        f.write(header('OBS', '0' * 30))
+        f.write(data.ljust(-(-len(data) // 80) * 80, b' '))
+
+
+def test_ibm_to_float():
+    values = [0, 1, -2.5, 0.5, 12345, 1e-5, 3.14159]
+    raw = np.frombuffer(b''.join(ibm(v) for v in values), dtype=np.uint8).reshape(-1, 8)
+    np.testing.assert_allclose(xpt.ibm_to_float(raw), values, rtol=1e-15)
+
+
+def test_sas_missing_codes():
+    codes = ['.', '_'] + [chr(c) for c in range(ord('A'), ord('Z') + 1)]
+    raw = np.frombuffer(b''.join(missing(code) for code in codes), dtype=np.uint8).reshape(-1, 8)
+    assert np.isnan(xpt.ibm_to_float(raw)).all()
+
+
+def test_short_numeric_columns_and_missing_values(tmp_path):
+    path = str(tmp_path / 'test.xpt')
+    variables = [('SEQN', True, 8), ('SHORT', True, 4), ('CODE', False, 8)]
+    rows = [
+        [ibm(93703), ibm(12345, 4), b'ABC     '],
+        [ibm(93704), missing('.', 4), b'        '],
+        [ibm(0), ibm(-2.5, 4), b'XY      '],
+        [missing('Z'), ibm(0, 4), b'Z       '],
+        # Short records are padded to 80 bytes with blanks, so the last one must not end in blanks
+        [ibm(7), ibm(1, 4), b'QUALITY1'],
+    ]
+    write_xpt(path, variables, rows)
+
+    frame = xpt.read(path)
+    np.testing.assert_array_equal(frame['SEQN'], [93703, 93704, 0, np.nan, 7])
+    np.testing.assert_array_equal(frame['SHORT'], [12345, np.nan, -2.5, 0, 1])
+    assert frame['CODE'].tolist() == ['ABC', '', 'XY', 'Z', 'QUALITY1']
+
+    expected = pd.read_sas(path, format='xport')
+    pd.testing.assert_frame_equal(frame[['SEQN', 'SHORT']], expected[['SEQN', 'SHORT']])
+
+
+def test_matches_pandas_on_nhanes_file():
+    frame = xpt.read(NHANES_XPT)
+    expected = pd.read_sas(NHANES_XPT, format='xport')
+    assert len(frame) > 0
+    pd.testing.assert_frame_equal(frame, expected)